@@ -1,12 +1,19 @@
 """认证模块 — JWT Token + 用户管理"""
 
+import base64
 import hashlib
+import hmac
 import json
 import logging
+import os
+import threading
 import time
 from pathlib import Path
 
-import jwt
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时回退标准库 json
+    orjson = None
 
 log = logging.getLogger(__name__)
 
@@ -14,18 +21,59 @@ USERS_FILE = Path("users.json")
 
 # 运行时状态
 _secret_key = "default-secret"
+_token_hmac = hmac.new(_secret_key.encode(), digestmod=hashlib.sha256)  # 已吸收密钥的 HMAC 上下文
 _admin_user = None  # {"username": ..., "password_hash": ..., "role": "admin"}
 
+# 房管索引缓存 {username: record}，按 users.json 的 mtime 失效
+_users_cache: dict[str, dict] = {}
+_users_mtime: int = -1
+# users.json 的 读取 → 修改 → 写回 必须整体串行，否则并发的登录/增删房管会互相覆盖
+_users_lock = threading.Lock()
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+# scrypt 参数（约 16 MB 内存，单次 ~50ms）
+_SCRYPT_N = 2 ** 14
+_SCRYPT_R = 8
+_SCRYPT_P = 1
+_HASH_PREFIX = "scrypt$"
+
+# Token 验证结果缓存 {token: (exp, user)}，面板轮询时免去重复验签；user 为 None 表示已拒绝
+_token_cache: dict[str, tuple[float, dict | None]] = {}
+_TOKEN_CACHE_SIZE = 256
+
+# JWT 固定头 {"alg":"HS256","typ":"JWT"} 的 base64url 编码（与 PyJWT 签发的一致）
+_JWT_HEADER = b"eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9"
+
+
+def hash_password(password: str, salt: bytes | None = None) -> str:
+    """计算带盐的 scrypt 密码哈希，格式: scrypt$<salt_hex>$<hash_hex>"""
+    if salt is None:
+        salt = os.urandom(16)
+    digest = hashlib.scrypt(
+        password.encode(), salt=salt, n=_SCRYPT_N, r=_SCRYPT_R, p=_SCRYPT_P, dklen=32,
+    )
+    return f"{_HASH_PREFIX}{salt.hex()}${digest.hex()}"
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """校验密码（兼容旧版无盐 SHA-256 哈希）"""
+    try:
+        if password_hash.startswith(_HASH_PREFIX):
+            salt_hex = password_hash[len(_HASH_PREFIX):].split("$", 1)[0]
+            candidate = hash_password(password, bytes.fromhex(salt_hex))
+        else:
+            candidate = hashlib.sha256(password.encode()).hexdigest()
+    except ValueError:
+        return False
+    return hmac.compare_digest(candidate, password_hash)
 
 
 def init_admin(config: dict):
     """从配置初始化超级管理员"""
-    global _secret_key, _admin_user
+    global _secret_key, _token_hmac, _admin_user
     auth_cfg = config.get("auth", {})
     _secret_key = auth_cfg.get("secret_key", "default-secret")
+    _token_hmac = hmac.new(_secret_key.encode(), digestmod=hashlib.sha256)
+    _token_cache.clear()
     username = auth_cfg.get("admin_username", "admin")
     password = auth_cfg.get("admin_password", "admin123")
     _admin_user = {
@@ -41,34 +89,83 @@ def load_users() -> list[dict]:
     if not USERS_FILE.exists():
         return []
     try:
-        with open(USERS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        data = USERS_FILE.read_bytes()
+        return orjson.loads(data) if orjson else json.loads(data)
     except (json.JSONDecodeError, IOError):
         return []
 
 
 def save_users(users: list[dict]):
     """保存房管列表"""
-    with open(USERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(users, f, ensure_ascii=False, indent=2)
+    global _users_mtime
+    if orjson:
+        USERS_FILE.write_bytes(orjson.dumps(users, option=orjson.OPT_INDENT_2))
+    else:
+        with open(USERS_FILE, "w", encoding="utf-8") as f:
+            json.dump(users, f, ensure_ascii=False, indent=2)
+    _users_mtime = -1  # mtime 精度不足时也强制刷新索引
+
+
+def _user_index() -> dict[str, dict]:
+    """返回 {username: record} 索引，users.json 未变化时直接复用缓存"""
+    global _users_cache, _users_mtime
+    try:
+        mtime = USERS_FILE.stat().st_mtime_ns
+    except OSError:
+        _users_cache, _users_mtime = {}, -1
+        return _users_cache
+    if mtime != _users_mtime:
+        _users_cache = {u["username"]: u for u in load_users()}
+        _users_mtime = mtime
+    return _users_cache
+
+
+def _upgrade_password_hash(username: str, password: str):
+    """将旧版 SHA-256 哈希升级为 scrypt"""
+    new_hash = hash_password(password)  # scrypt 较慢，放在锁外计算
+    with _users_lock:
+        users = load_users()
+        for user in users:
+            # 期间已被删除或已升级的房管不再改写
+            if user["username"] == username and not user["password_hash"].startswith(_HASH_PREFIX):
+                user["password_hash"] = new_hash
+                save_users(users)
+                log.info("已升级房管密码哈希: %s", username)
+                return
 
 
 def authenticate(username: str, password: str) -> dict | None:
     """验证登录，返回用户信息或 None"""
-    pw_hash = hash_password(password)
-
     # 检查超级管理员
-    if _admin_user and username == _admin_user["username"] and pw_hash == _admin_user["password_hash"]:
+    if _admin_user and username == _admin_user["username"] \
+            and verify_password(password, _admin_user["password_hash"]):
         return {"username": username, "role": "admin"}
 
     # 检查房管
-    for user in load_users():
-        if user["username"] == username and user["password_hash"] == pw_hash:
-            return {"username": username, "role": "mod"}
+    user = _user_index().get(username)
+    if user and verify_password(password, user["password_hash"]):
+        if not user["password_hash"].startswith(_HASH_PREFIX):
+            _upgrade_password_hash(username, password)
+        return {"username": username, "role": "mod"}
 
     return None
 
 
+def _b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _sign(signing_input: bytes) -> bytes:
+    """HS256 签名：复制预置密钥的 HMAC 上下文，省去每次重新派生 ipad/opad"""
+    mac = _token_hmac.copy()
+    mac.update(signing_input)
+    return _b64url_encode(mac.digest())
+
+
 def create_token(username: str, role: str) -> str:
     """生成 JWT Token"""
     payload = {
@@ -76,16 +173,36 @@ def create_token(username: str, role: str) -> str:
         "role": role,
         "exp": int(time.time()) + 86400 * 7,  # 7 天有效
     }
-    return jwt.encode(payload, _secret_key, algorithm="HS256")
+    body = orjson.dumps(payload) if orjson else json.dumps(payload, separators=(",", ":")).encode()
+    signing_input = _JWT_HEADER + b"." + _b64url_encode(body)
+    return (signing_input + b"." + _sign(signing_input)).decode("ascii")
 
 
 def verify_token(token: str) -> dict | None:
     """验证 Token，返回 payload 或 None"""
+    cached = _token_cache.get(token)
+    if cached is not None:
+        exp, user = cached
+        # user 为 None 的是缓存的拒绝结果（exp=0），同样直接返回 None
+        return dict(user) if exp > time.time() else None
+
+    # 验签失败、格式错误或已过期的 Token 同样缓存（exp=0），重复提交时直接拒绝
+    exp, user = 0, None
     try:
-        payload = jwt.decode(token, _secret_key, algorithms=["HS256"])
-        return {"username": payload["sub"], "role": payload["role"]}
-    except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
-        return None
+        signing_input, _, signature = token.encode("ascii").rpartition(b".")
+        header, _, body = signing_input.partition(b".")
+        if header == _JWT_HEADER and hmac.compare_digest(_sign(signing_input), signature):
+            raw = _b64url_decode(body)
+            payload = orjson.loads(raw) if orjson else json.loads(raw)
+            if payload["exp"] > time.time():
+                exp, user = payload["exp"], {"username": payload["sub"], "role": payload["role"]}
+    except (ValueError, KeyError, TypeError):
+        pass
+
+    if len(_token_cache) >= _TOKEN_CACHE_SIZE:
+        _token_cache.clear()
+    _token_cache[token] = (exp, user)
+    return dict(user) if user else None
 
 
 def add_user(username: str, password: str) -> tuple[bool, str]:
@@ -93,27 +210,32 @@ def add_user(username: str, password: str) -> tuple[bool, str]:
     if _admin_user and username == _admin_user["username"]:
         return False, "不能与管理员同名"
 
-    users = load_users()
-    if any(u["username"] == username for u in users):
+    if username in _user_index():
         return False, "用户名已存在"
 
-    users.append({
-        "username": username,
-        "password_hash": hash_password(password),
-        "role": "mod",
-    })
-    save_users(users)
+    password_hash = hash_password(password)  # scrypt 较慢，放在锁外计算
+    with _users_lock:
+        users = load_users()
+        if any(u["username"] == username for u in users):
+            return False, "用户名已存在"
+        users.append({
+            "username": username,
+            "password_hash": password_hash,
+            "role": "mod",
+        })
+        save_users(users)
     log.info("创建房管: %s", username)
     return True, "创建成功"
 
 
 def delete_user(username: str) -> tuple[bool, str]:
     """删除房管"""
-    users = load_users()
-    new_users = [u for u in users if u["username"] != username]
-    if len(new_users) == len(users):
-        return False, "用户不存在"
-    save_users(new_users)
+    with _users_lock:
+        users = load_users()
+        new_users = [u for u in users if u["username"] != username]
+        if len(new_users) == len(users):
+            return False, "用户不存在"
+        save_users(new_users)
     log.info("删除房管: %s", username)
     return True, "删除成功"
 
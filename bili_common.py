@@ -0,0 +1,44 @@
+"""B 站直播姬接口公共工具（bilibili_api 与命令行工具共用）"""
+
+import hashlib
+import re
+import time
+import uuid
+from typing import Dict, Tuple
+
+# 直播姬客户端请求头模板（Cookie 由调用方补充）
+LIVEHIME_HEADERS = {
+    'User-Agent': 'LiveHime/7.7.0.8681 os/Windows pc_app/livehime build/8681 osVer/10.0_x86_64',
+    'Content-Type': 'application/x-www-form-urlencoded',
+    'Connection': 'keep-alive',
+}
+
+# 单遍匹配各段 "key=value"，首尾空白处理与逐段 strip + split('=', 1) 一致
+_COOKIE_RE = re.compile(r'(?:^|;)\s*([^;=]*)=([^;]*?)\s*(?=;|\Z)')
+
+# cookie字符串中解析出各个键值对
+def parse_cookies(cookie_str: str) -> Dict[str, str]:
+    return dict(_COOKIE_RE.findall(cookie_str))
+
+# 从cookies中提取csrf (bili_jct)
+def get_csrf_from_cookies(cookies: Dict[str, str]) -> str:
+    return cookies.get('bili_jct', '')
+
+# 签名生成函数
+def generate_sign(params: dict, appkey: str) -> str:
+    param_keys = sorted(params.keys())
+    query = '&'.join([f"{k}={params[k]}" for k in param_keys])
+    sign_str = query + appkey
+    return hashlib.md5(sign_str.encode('utf-8')).hexdigest()
+
+def split_sign_params(params: dict, appkey: str) -> Tuple[str, str]:
+    """预拼接签名串中 ts 前后的固定部分，返回 (head, tail)，签名串即 head + ts + tail"""
+    keys = sorted([*params, 'ts'])
+    i = keys.index('ts')
+    head = ''.join(f"{k}={params[k]}&" for k in keys[:i]) + 'ts='
+    tail = ''.join(f"&{k}={params[k]}" for k in keys[i + 1:]) + appkey
+    return head, tail
+
+# TraceID生成函数
+def generate_trace_id() -> str:
+    return f"PC_LINK:{str(uuid.uuid4()).upper()}:{int(time.time() * 1000)}"
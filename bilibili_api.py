@@ -1,32 +1,21 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import hashlib
-import uuid
 import logging
-from typing import Dict, Tuple, Optional
+from typing import Tuple, Optional
+from urllib.parse import urlencode
 
-log = logging.getLogger(__name__)
-
-def parse_cookies(cookie_str: str) -> Dict[str, str]:
-    cookies = {}
-    for item in cookie_str.split(';'):
-        item = item.strip()
-        if '=' in item:
-            key, value = item.split('=', 1)
-            cookies[key] = value
-    return cookies
-
-def get_csrf_from_cookies(cookies: Dict[str, str]) -> str:
-    return cookies.get('bili_jct', '')
+from bili_common import (
+    LIVEHIME_HEADERS,
+    generate_trace_id,
+    get_csrf_from_cookies,
+    parse_cookies,
+    split_sign_params,
+)
 
-def generate_sign(params: dict, appkey: str) -> str:
-    param_keys = sorted(params.keys())
-    query = '&'.join([f"{k}={params[k]}" for k in param_keys])
-    sign_str = query + appkey
-    return hashlib.md5(sign_str.encode('utf-8')).hexdigest()
-
-def generate_trace_id() -> str:
-    return f"PC_LINK:{str(uuid.uuid4()).upper()}:{int(time.time() * 1000)}"
+log = logging.getLogger(__name__)
 
 class BilibiliAPI:
     def __init__(self, room_id: str, cookie_str: str):
@@ -36,12 +25,26 @@ class BilibiliAPI:
         self.csrf = get_csrf_from_cookies(self.parsed_cookies)
         
         self.appkey = 'aae92bc66f3edfab'
-        self.common_headers = {
-            'User-Agent': 'LiveHime/7.7.0.8681 os/Windows pc_app/livehime build/8681 osVer/10.0_x86_64',
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Cookie': self.cookie_str,
-            'Connection': 'keep-alive',
-        }
+        self.common_headers = {**LIVEHIME_HEADERS, 'Cookie': self.cookie_str}
+
+        # 复用 TCP/TLS 连接，避免每次请求重新握手
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(
+            pool_connections=1, pool_maxsize=2,
+            max_retries=Retry(total=2, backoff_factor=0.3),
+        ))
+        self._session.headers.update(self.common_headers)
+
+        # 开/关播参数除 ts 外固定不变，预先拼好签名串和 urlencode 后的请求体
+        start_data = self._get_base_data()
+        start_data['area_v2'] = '624'  # 默认单机游戏分类，可在此更改
+        start_data['type'] = '2'
+        start_data['backup_stream'] = '0'
+        self._start_body = urlencode(start_data)
+        self._start_sign = split_sign_params(start_data, self.appkey)
+        stop_data = self._get_base_data()
+        self._stop_body = urlencode(stop_data)
+        self._stop_sign = split_sign_params(stop_data, self.appkey)
 
     def _get_base_data(self) -> dict:
         return {
@@ -53,9 +56,16 @@ class BilibiliAPI:
             'appkey': self.appkey,
             'build': '8681',
             'version': '7.7.0.8681',
-            'ts': int(time.time()),
         }
 
+    @staticmethod
+    def _signed_body(body: str, sign_parts: Tuple[str, str]) -> str:
+        """在预编码的请求体后附加当前 ts 与签名"""
+        ts = int(time.time())
+        head, tail = sign_parts
+        sign = hashlib.md5(f"{head}{ts}{tail}".encode('utf-8')).hexdigest()
+        return f"{body}&ts={ts}&sign={sign}"
+
     def start_live(self) -> Tuple[bool, Optional[str], Optional[str], str]:
         """
         开启直播房
@@ -64,18 +74,13 @@ class BilibiliAPI:
         if not self.csrf:
             return False, None, None, "Cookie 中缺少 bili_jct (csrf)，无法鉴权"
 
-        data = self._get_base_data()
-        data['area_v2'] = '624'  # 默认单机游戏分类，可在此更改
-        data['type'] = '2'
-        data['backup_stream'] = '0'
-        data['sign'] = generate_sign(data, self.appkey)
+        data = self._signed_body(self._start_body, self._start_sign)
 
-        headers = {**self.common_headers, 'X-Event-TraceID': generate_trace_id()}
+        self._session.headers['X-Event-TraceID'] = generate_trace_id()
         
         try:
-            resp = requests.post(
+            resp = self._session.post(
                 'https://api.live.bilibili.com/room/v1/Room/startLive',
-                headers=headers,
                 data=data,
                 timeout=10
             ).json()
@@ -101,15 +106,13 @@ class BilibiliAPI:
         if not self.csrf:
             return False, "Cookie 中缺少 csrf"
             
-        data = self._get_base_data()
-        data['sign'] = generate_sign(data, self.appkey)
+        data = self._signed_body(self._stop_body, self._stop_sign)
         
-        headers = {**self.common_headers, 'X-Event-TraceID': generate_trace_id()}
+        self._session.headers['X-Event-TraceID'] = generate_trace_id()
         
         try:
-            resp = requests.post(
+            resp = self._session.post(
                 'https://api.live.bilibili.com/room/v1/Room/stopLive',
-                headers=headers,
                 data=data,
                 timeout=10
             ).json()
@@ -1,33 +1,15 @@
 import requests
 import argparse
 import time
-import hashlib
-import uuid
 from urllib.parse import parse_qs
 
-# cookie字符串中解析出各个键值对
-def parse_cookies(cookie_str):
-    cookies = {}
-    for item in cookie_str.split(';'):
-        item = item.strip()
-        if '=' in item:
-            key, value = item.split('=', 1)
-            cookies[key] = value
-    return cookies
-# 从cookies中提取csrf (bili_jct)
-def get_csrf_from_cookies(cookies):
-    return cookies.get('bili_jct', '')
-
-# 签名生成函数
-def generate_sign(params, appkey):
-    param_keys = sorted(params.keys())
-    query = '&'.join([f"{k}={params[k]}" for k in param_keys])
-    sign_str = query + appkey
-    return hashlib.md5(sign_str.encode('utf-8')).hexdigest()
-
-# TraceID生成函数
-def generate_trace_id():
-    return f"PC_LINK:{str(uuid.uuid4()).upper()}:{int(time.time() * 1000)}"
+from bili_common import (
+    LIVEHIME_HEADERS,
+    generate_sign,
+    generate_trace_id,
+    get_csrf_from_cookies,
+    parse_cookies,
+)
 
 # ※※※复制你的cookie在下面，注意放在""里※※※
 common_cookies = ""
@@ -36,11 +18,9 @@ csrf_value = get_csrf_from_cookies(parsed_cookies)
 
 # 直播姬客户端UA
 common_headers = {
-    'User-Agent': 'LiveHime/7.7.0.8681 os/Windows pc_app/livehime build/8681 osVer/10.0_x86_64',
-    'Content-Type': 'application/x-www-form-urlencoded',
+    **LIVEHIME_HEADERS,
     'Cookie': common_cookies,
     'X-Event-TraceID': generate_trace_id(),  # 动态TraceID头
-    'Connection': 'keep-alive',
 }
 
 # 开播参数
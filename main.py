@@ -10,7 +10,6 @@ import yaml
 
 from playlist import Playlist
 from sources.local import LocalSource
-from sources.webdav import WebDAVSource
 from streamer import Streamer
 import auth
 import web
@@ -23,6 +22,9 @@ logging.basicConfig(
 )
 log = logging.getLogger(__name__)
 
+# 优先使用 libyaml 的 C 解析器，未编译 libyaml 时回退纯 Python 实现
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def load_config(path: str = "config.yaml") -> dict:
     """加载配置文件"""
@@ -32,7 +34,7 @@ def load_config(path: str = "config.yaml") -> dict:
         sys.exit(1)
 
     with open(config_path, "r", encoding="utf-8") as f:
-        config = yaml.safe_load(f)
+        config = yaml.load(f, Loader=_YamlLoader)
 
     log.info("配置已加载: %s", config_path)
     return config
@@ -52,12 +54,15 @@ def build_sources(config: dict) -> list:
                 extensions=extensions,
             ))
         elif src_type == "webdav":
+            from sources.webdav import SCAN_WORKERS, WebDAVSource  # 按需导入，未配置 WebDAV 时不加载 httpx/webdav4
             sources.append(WebDAVSource(
                 url=src_cfg["url"],
                 username=src_cfg["username"],
                 password=src_cfg["password"],
                 path=src_cfg.get("path", "/"),
                 extensions=extensions,
+                scan_workers=src_cfg.get("scan_workers", SCAN_WORKERS),
+                exclude_dirs=src_cfg.get("exclude_dirs"),
             ))
         else:
             log.warning("未知视频源类型: %s", src_type)
@@ -1,5 +1,6 @@
 """播放列表管理"""
 
+import atexit
 import json
 import logging
 import random
@@ -8,19 +9,31 @@ from pathlib import Path
 
 from sources import VideoItem, VideoSource
 
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时回退标准库 json
+    orjson = None
+
 log = logging.getLogger(__name__)
 
 PROGRESS_FILE = Path("progress.json")
+PROGRESS_FLUSH_INTERVAL = 2.0  # 进度写盘的合并间隔（秒）
 
 
 class Playlist:
     def __init__(self, sources: list[VideoSource], mode: str = "sequential"):
         self.sources = sources
         self.mode = mode
-        self._videos: list[VideoItem] = []
+        self._videos: tuple[VideoItem, ...] = ()  # 只整体替换，不原地修改
+        self._name_index: dict[str, int] = {}  # 视频名 -> 首次出现的索引
         self._index = 0
         self._lock = threading.Lock()
         self._resume_position: float = 0.0  # 恢复播放的秒数
+        self._pending_progress: dict | None = None  # 待写盘的进度
+        self._flush_timer: threading.Timer | None = None
+        self._flush_lock = threading.Lock()  # 串行化写盘，保证新进度不被旧进度覆盖
+        # 定时器是守护线程，进程退出时不会等它；停止推流后才记下的最后位置由这里写盘
+        atexit.register(self.flush_progress)
         self.reload()
 
     def reload(self):
@@ -29,17 +42,22 @@ class Playlist:
         for source in self.sources:
             videos.extend(source.list_videos())
 
+        if self.mode == "random":
+            random.shuffle(videos)
+
+        # 倒序构建，使重名视频保留首次出现的索引（dict/zip 均在 C 层循环）
+        names = [v.name for v in videos]
+        name_index = dict(zip(reversed(names), range(len(names) - 1, -1, -1)))
+
         with self._lock:
-            self._videos = videos
+            self._videos = tuple(videos)
+            self._name_index = name_index
             self._index = 0
 
         if not videos:
             log.warning("未找到任何视频文件")
             return
 
-        if self.mode == "random":
-            random.shuffle(self._videos)
-
         # 尝试从进度文件恢复
         self._restore_progress()
 
@@ -48,17 +66,19 @@ class Playlist:
     def next(self) -> VideoItem | None:
         """获取下一个视频，播完自动循环"""
         with self._lock:
-            if not self._videos:
-                pass  # 释放锁后 reload
-            else:
-                video = self._videos[self._index]
-                self._index += 1
+            videos = self._videos
+            if videos:
+                # 取模：后台 reload 尚未完成时从头循环，不会越界
+                i = self._index % len(videos)
+                self._index = i + 1
                 self._save_progress()
-                if self._index >= len(self._videos):
-                    log.info("一轮播放完毕，重新加载列表")
-                    # 先释放锁再 reload（reload 内部也会加锁）
-                    threading.Thread(target=self.reload, daemon=True).start()
-                return video
+                round_done = self._index >= len(videos)
+
+        if videos:
+            if round_done:
+                log.info("一轮播放完毕，重新加载列表")
+                threading.Thread(target=self.reload, daemon=True).start()
+            return videos[i]
 
         # 无视频，尝试重新加载
         self.reload()
@@ -81,16 +101,17 @@ class Playlist:
     @property
     def videos(self) -> list[dict]:
         """返回视频列表摘要（供 Web 面板使用）"""
-        with self._lock:
-            return [
-                {"index": i, "name": v.name, "current": i == self._index - 1}
-                for i, v in enumerate(self._videos)
-            ]
+        # 列表为不可变元组，取引用快照后无需持锁
+        videos = self._videos
+        current = self._index - 1
+        return [
+            {"index": i, "name": v.name, "current": i == current}
+            for i, v in enumerate(videos)
+        ]
 
     @property
     def total(self) -> int:
-        with self._lock:
-            return len(self._videos)
+        return len(self._videos)
 
     def switch_path(self, new_path: str):
         """切换 WebDAV 源的播放路径并重新加载"""
@@ -117,37 +138,65 @@ class Playlist:
             self._save_progress(position=position)
 
     def _save_progress(self, position: float = 0.0):
-        """保存当前播放进度（在锁内调用）"""
+        """记录当前播放进度（在锁内调用），由定时器合并写盘"""
         if not self._videos:
             return
-        try:
-            data = {
-                "index": self._index,
-                "video_name": self._videos[self._index - 1].name if self._index > 0 else "",
-                "position": round(position, 1),
-            }
-            PROGRESS_FILE.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
-        except Exception as e:
-            log.warning("保存进度失败: %s", e)
+        self._pending_progress = {
+            "index": self._index,
+            "video_name": self._videos[self._index - 1].name if self._index > 0 else "",
+            "position": round(position, 1),
+        }
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(PROGRESS_FLUSH_INTERVAL, self.flush_progress)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush_progress(self):
+        """将待保存的进度写入 progress.json（退出前应调用一次）"""
+        # 先取消待触发的定时器，再等待可能正在进行的写盘
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        with self._flush_lock:
+            with self._lock:
+                data = self._pending_progress
+                self._pending_progress = None
+            if data is None:
+                return
+            try:
+                if orjson:
+                    raw = orjson.dumps(data)
+                else:
+                    raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                # 先序列化再一次写入覆盖原文件；不用临时文件 + os.replace，
+                # 因为 Docker 部署中 progress.json 是单文件挂载，无法被替换
+                PROGRESS_FILE.write_bytes(raw)
+            except Exception as e:
+                log.warning("保存进度失败: %s", e)
 
     def _restore_progress(self):
-        """从进度文件恢复播放位置"""
-        if not PROGRESS_FILE.exists():
-            return
+        """恢复播放位置：优先用尚未写盘的进度，其次读进度文件"""
+        with self._lock:
+            data = self._pending_progress  # 合并写盘期间，它比文件里的进度新
         try:
-            data = json.loads(PROGRESS_FILE.read_text(encoding="utf-8"))
+            if data is None:
+                if not PROGRESS_FILE.exists():
+                    return
+                raw = PROGRESS_FILE.read_bytes()
+                data = orjson.loads(raw) if orjson else json.loads(raw)
             saved_index = data.get("index", 0)
             saved_name = data.get("video_name", "")
             saved_position = data.get("position", 0.0)
 
             with self._lock:
                 # 优先按视频名匹配（防止列表顺序变化）
-                for i, v in enumerate(self._videos):
-                    if v.name == saved_name:
-                        self._index = i
-                        self._resume_position = saved_position
-                        log.info("▶ 从进度恢复: %s (第 %d 个, 位置 %.1f 秒)", saved_name, i + 1, saved_position)
-                        return
+                i = self._name_index.get(saved_name)
+                if i is not None:
+                    self._index = i
+                    self._resume_position = saved_position
+                    log.info("▶ 从进度恢复: %s (第 %d 个, 位置 %.1f 秒)", saved_name, i + 1, saved_position)
+                    return
 
                 # 名称未匹配到，尝试用索引恢复
                 if 0 <= saved_index < len(self._videos):
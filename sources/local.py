@@ -1,6 +1,7 @@
 """本地文件夹视频源"""
 
 import logging
+import os
 from pathlib import Path
 
 from sources import VideoItem, VideoSource
@@ -12,18 +13,69 @@ class LocalSource(VideoSource):
     def __init__(self, path: str, extensions: list[str]):
         self.path = Path(path)
         self.extensions = {ext.lower() for ext in extensions}
+        self._ext_tuple = tuple(self.extensions)  # 供 str.endswith 一次匹配
+        # 目录缓存 {目录路径: (mtime_ns, 该目录下的视频, 子目录列表)}
+        self._dir_cache: dict[str, tuple[int, list[VideoItem], list[str]]] = {}
+        self._videos: list[VideoItem] = []
 
     def list_videos(self) -> list[VideoItem]:
         if not self.path.exists():
             log.warning("目录不存在: %s", self.path)
             return []
 
-        videos = []
-        for file in sorted(self.path.rglob("*")):
-            if file.is_file() and file.suffix.lower() in self.extensions:
-                videos.append(VideoItem(
-                    name=file.name,
-                    ffmpeg_input=str(file),
-                ))
-        log.info("%s -> 找到 %d 个视频", self.path, len(videos))
-        return videos
+        seen: set[str] = set()
+        changed = self._refresh_dir(str(self.path), seen)
+        # 删除已消失目录的缓存
+        for stale in self._dir_cache.keys() - seen:
+            del self._dir_cache[stale]
+            changed = True
+
+        if changed:
+            videos = []
+            self._collect(str(self.path), videos)
+            videos.sort(key=lambda v: v.ffmpeg_input.split(os.sep))
+            self._videos = videos
+            log.info("%s -> 找到 %d 个视频", self.path, len(videos))
+        return list(self._videos)
+
+    def _refresh_dir(self, dir_path: str, seen: set[str]) -> bool:
+        """按目录 mtime 增量刷新缓存，返回目录树是否有变化"""
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            return False
+        seen.add(dir_path)
+
+        changed = False
+        cached = self._dir_cache.get(dir_path)
+        if cached is None or cached[0] != mtime:
+            files: list[VideoItem] = []
+            subdirs: list[str] = []
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith(self._ext_tuple) and entry.is_file():
+                            files.append(VideoItem(name=entry.name, ffmpeg_input=entry.path))
+            except OSError as e:
+                log.warning("读取目录失败 %s: %s", dir_path, e)
+            # mtime 变化但视频与子目录未变（如新增字幕、缩略图）时不视为变化
+            if cached is None or files != cached[1] or subdirs != cached[2]:
+                changed = True
+            cached = (mtime, files, subdirs)
+            self._dir_cache[dir_path] = cached
+
+        for sub in cached[2]:
+            if self._refresh_dir(sub, seen):
+                changed = True
+        return changed
+
+    def _collect(self, dir_path: str, out: list[VideoItem]):
+        """从缓存中收集目录树下的全部视频"""
+        cached = self._dir_cache.get(dir_path)
+        if cached is None:
+            return
+        out.extend(cached[1])
+        for sub in cached[2]:
+            self._collect(sub, out)
@@ -2,35 +2,103 @@
 
 import base64
 import logging
+import random
+import re
 import time
-from urllib.parse import quote
+import urllib.request
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 
 import httpx
 from webdav4.client import Client
+from webdav4.urls import relative_url_to, strip_trailing_slash
 
 from sources import VideoItem, VideoSource
 
 log = logging.getLogger(__name__)
 
+SCAN_WORKERS = 16  # 默认并发列举目录的线程数
+# 默认跳过的目录（回收站、快照、NAS 缩略图等），不会包含要播放的视频
+DEFAULT_EXCLUDE_DIRS = frozenset({".Trash", ".snapshot", "@Recycle", ".thumbnails", "@eaDir"})
+
+# 只请求 resourcetype，避免服务器返回大小、修改时间等用不到的属性
+PROPFIND_MINIMAL = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<d:propfind xmlns:d="DAV:"><d:prop><d:resourcetype/></d:prop></d:propfind>'
+)
+LISTING_CACHE_TTL = 300.0  # 目录列举结果的缓存时间（秒）
+# 服务器拒绝 Depth: infinity 时常见的状态码（507 表示结果过大）
+_DEPTH_INFINITY_REJECTED = {400, 403, 405, 501, 507}
+
+# 值得重试的瞬时网络错误；认证失败等 4xx 错误重试也无济于事
+_TRANSIENT_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+_DAV_RESPONSE = "{DAV:}response"
+_DAV_HREF = "{DAV:}href"
+_DAV_COLLECTION = ".//{DAV:}resourcetype/{DAV:}collection"
+
+
+def _env_proxy(url: httpx.URL) -> str | None:
+    """按代理环境变量返回访问 url 应使用的代理地址（NO_PROXY 命中或未配置时为 None）"""
+    if url.host and urllib.request.proxy_bypass(url.host):
+        return None
+    proxies = urllib.request.getproxies()
+    return proxies.get(url.scheme) or proxies.get("all")
+
 
 class WebDAVSource(VideoSource):
     def __init__(self, url: str, username: str, password: str,
-                 path: str, extensions: list[str]):
+                 path: str, extensions: list[str],
+                 scan_workers: int = SCAN_WORKERS,
+                 exclude_dirs: set[str] | None = None):
         self.url = url.rstrip("/")
+        base = httpx.URL(self.url)
+        self._origin = f"{base.scheme}://{base.netloc.decode('ascii')}"  # 拼接视频 URL 用
         self.path = path
         self.extensions = {ext.lower() for ext in extensions}
+        # 忽略大小写的扩展名匹配，无需为每个文件名生成小写副本
+        self._ext_re = re.compile(
+            "(?:" + "|".join(map(re.escape, sorted(self.extensions))) + r")\Z"
+            if self.extensions else r"(?!)",
+            re.IGNORECASE,
+        )
+        self.scan_workers = max(1, scan_workers)  # 同时进行的 PROPFIND 请求上限
+        self.exclude_dirs = frozenset(DEFAULT_EXCLUDE_DIRS if exclude_dirs is None else exclude_dirs)
 
         # 自定义 httpx 客户端（兼容 123 盘等 SSL 问题）
+        # 连接池与并发数匹配，扫描时复用 TCP/TLS 连接而不是每次重新握手；
+        # 建立连接失败时由 transport 直接重试。
+        # 显式传入 transport 后 httpx 不再读取代理环境变量，这里按
+        # HTTP(S)_PROXY / ALL_PROXY / NO_PROXY 自行选出本源的代理交给 transport
+        transport = httpx.HTTPTransport(
+            verify=False,
+            retries=2,
+            limits=httpx.Limits(
+                max_connections=self.scan_workers * 2,
+                max_keepalive_connections=self.scan_workers,
+                keepalive_expiry=60.0,
+            ),
+            proxy=_env_proxy(base),
+        )
         http_client = httpx.Client(
             auth=(username, password),
-            verify=False,
             timeout=30,
+            transport=transport,
         )
         self.client = Client(base_url=self.url, http_client=http_client)
 
         # FFmpeg HTTP Basic Auth 值（不含 "Authorization: " 前缀）
         credentials = base64.b64encode(f"{username}:{password}".encode()).decode()
         self._auth_value = f"Basic {credentials}"
+        # 所有 VideoItem 共用同一个请求头字典（只读，下游不得修改）
+        self._auth_headers = {"Authorization": self._auth_value}
+
+        # 服务器是否支持 Depth: infinity（None 表示尚未探测）
+        self._depth_infinity: bool | None = None
+        # 目录列举缓存 {去掉首尾 "/" 的目录路径: (写入时间, 条目列表)}
+        self._listing_cache: dict[str, tuple[float, list[dict]]] = {}
 
     def list_videos(self) -> list[VideoItem]:
         max_retries = 3
@@ -40,74 +108,273 @@ class WebDAVSource(VideoSource):
                 log.info("%s%s -> 找到 %d 个视频", self.url, self.path, len(items))
                 return items
             except Exception as e:
+                if not self._is_transient(e):
+                    log.warning("扫描失败: %s", e)
+                    return []
                 log.warning("扫描失败 (第%d次): %s", attempt + 1, e)
                 if attempt < max_retries - 1:
-                    wait = (attempt + 1) * 3
-                    log.info("%d 秒后重试...", wait)
+                    # 带随机抖动的指数退避，避免多个客户端同时重试
+                    wait = min(30.0, 0.5 * 2 ** attempt) + random.uniform(0, 0.5)
+                    log.info("%.1f 秒后重试...", wait)
                     time.sleep(wait)
         return []
 
+    @staticmethod
+    def _is_transient(e: Exception) -> bool:
+        """网络超时、连接中断或服务器 5xx 视为可重试的瞬时错误"""
+        if isinstance(e, httpx.HTTPStatusError):
+            return e.response.status_code >= 500
+        return isinstance(e, _TRANSIENT_ERRORS)
+
     def list_dirs(self, dir_path: str = "/") -> list[dict]:
         """列举指定目录下的子目录和视频文件（不递归）"""
-        items = []
-        try:
-            entries = self.client.ls(dir_path, detail=True)
-        except Exception as e:
-            log.warning("列举 %s 失败: %s", dir_path, e)
-            return items
+        entries = self._cache_get(dir_path)
+        if entries is None:
+            try:
+                entries = self._ls(dir_path)
+            except Exception as e:
+                log.warning("列举 %s 失败: %s", dir_path, e)
+                return []
+            self._cache_put(dir_path, entries)
 
+        dirs, files = [], []
         for entry in entries:
             name = entry.get("name", "")
             entry_type = entry.get("type", "")
             display_name = name.rstrip("/").split("/")[-1]
 
             if entry_type == "directory":
-                items.append({"name": display_name, "path": name, "type": "dir"})
-            else:
-                dot_idx = name.rfind(".")
-                ext = name[dot_idx:].lower() if dot_idx != -1 else ""
-                if ext in self.extensions:
-                    items.append({"name": display_name, "path": name, "type": "file"})
+                if self._excluded(name):
+                    continue
+                dirs.append({"name": display_name, "path": name, "type": "dir"})
+            elif self._ext_re.search(name):
+                files.append({"name": display_name, "path": name, "type": "file"})
 
         # 目录在前，文件在后，各自按名称排序
-        dirs = sorted([i for i in items if i["type"] == "dir"], key=lambda x: x["name"])
-        files = sorted([i for i in items if i["type"] == "file"], key=lambda x: x["name"])
+        dirs.sort(key=itemgetter("name"))
+        files.sort(key=itemgetter("name"))
         return dirs + files
 
     def _scan_recursive(self, dir_path: str) -> list[VideoItem]:
-        """递归扫描 WebDAV 目录"""
+        """扫描 WebDAV 目录树，优先一次 Depth: infinity 请求取回整棵树"""
+        listings = self._cached_tree(dir_path)
+        if listings is None and self._depth_infinity is not False:
+            listings = self._list_tree(dir_path)
+        if listings is None:
+            listings = self._list_levels(dir_path)
+
         videos: list[VideoItem] = []
+        self._collect(dir_path, listings, videos)
+        return videos
+
+    def _list_tree(self, dir_path: str) -> dict[str, list[dict]] | None:
+        """用单个 Depth: infinity 的 PROPFIND 列举整棵目录树，不支持时返回 None"""
         try:
-            entries = self.client.ls(dir_path, detail=True)
+            listings = self._propfind(dir_path, "infinity")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in _DEPTH_INFINITY_REJECTED:
+                log.warning("Depth: infinity 列举 %s 失败，改为逐层列举: %s", dir_path, e)
+                return None
+            self._disable_depth_infinity(e)
+            return None
+        except ValueError as e:
+            # 非 207 响应
+            self._disable_depth_infinity(e)
+            return None
+        except Exception as e:
+            log.warning("Depth: infinity 列举 %s 失败，改为逐层列举: %s", dir_path, e)
+            return None
+        # 内容没有随响应返回的子目录。SabreDAV（Nextcloud、ownCloud 等）默认把
+        # Depth: infinity 当作 Depth: 1 处理且不报错，此时只有根目录的直接子项
+        missing = [d for entries in listings.values() for d in self._subdirs(entries) if d not in listings]
+        if missing and len(listings) == 1:
+            self._disable_depth_infinity(ValueError("响应只包含一层目录"))
+            return None
+        self._depth_infinity = True
+        for d, entries in listings.items():
+            self._cache_put(d, entries)
+        # 剩下的多是空目录（响应里没有子项可以证明已列举），逐层补齐
+        return self._walk_levels(missing, listings)
+
+    def _ls(self, dir_path: str) -> list[dict]:
+        """列举单个目录（Depth: 1，只取 resourcetype）"""
+        return self._propfind(dir_path, "1")[dir_path]
+
+    def _propfind(self, dir_path: str, depth: str) -> dict[str, list[dict]]:
+        """发送精简属性的 PROPFIND，按父目录分组返回 {目录: 条目列表}
+
+        响应体边下载边增量解析，处理完的 <response> 立即释放，不在内存中构建整棵 DOM。
+        只返回子目录和视频文件，条目格式与 webdav4 的 ls(detail=True) 一致
+        （name 为相对 base_url 的路径），文件条目另带 FFmpeg 可用的 url
+        """
+        base_url = self.client.base_url
+        root = strip_trailing_slash(self.client.join_url(dir_path).path)
+        listings: dict[str, list[dict]] = {dir_path: []}
+        # Depth: infinity 时记录 {子目录 href: 相对路径} 和出现过子项的目录 href，
+        # 只有确实返回了子项的目录才算列举过
+        collections: dict[str, str] = {}
+        parents: set[str] = set()
+
+        with self.client.http.stream(
+            "PROPFIND",
+            self.client.join_url(dir_path),
+            content=PROPFIND_MINIMAL,
+            headers={"Depth": depth, "Content-Type": "application/xml"},
+            follow_redirects=True,
+        ) as resp:
+            resp.raise_for_status()
+            if resp.status_code != 207:
+                raise ValueError(f"PROPFIND 返回 {resp.status_code}，不是 207 Multi-Status")
+
+            parser = ET.XMLPullParser(events=("start", "end"))
+            multistatus = None
+            for chunk in resp.iter_bytes():
+                parser.feed(chunk)
+                for event, elem in parser.read_events():
+                    if event == "start":
+                        if multistatus is None:
+                            multistatus = elem
+                        continue
+                    if elem.tag != _DAV_RESPONSE:
+                        continue
+
+                    href = (elem.findtext(_DAV_HREF) or "").strip()
+                    is_dir = elem.find(_DAV_COLLECTION) is not None
+                    multistatus.clear()  # 已处理的 <response> 不再保留
+                    if depth == "infinity":
+                        parents.add(href.rstrip("/").rpartition("/")[0])
+                    # 非视频文件直接丢弃，不做 URL 解析和条目构建（扩展名为 ASCII，编码前后一致）
+                    if not href or (not is_dir and not self._ext_re.search(href)):
+                        continue
+
+                    url = httpx.URL(href)
+                    path = strip_trailing_slash(url.path)
+                    if path == root:
+                        continue
+                    if is_dir and depth == "infinity":
+                        collections[href.rstrip("/")] = relative_url_to(base_url, path)
+                    parent = path.rpartition("/")[0]
+                    key = dir_path if parent == root else relative_url_to(base_url, parent)
+                    entry = {
+                        "name": relative_url_to(base_url, path),
+                        "type": "directory" if is_dir else "file",
+                    }
+                    if not is_dir:
+                        # 直接沿用服务器返回的 href 编码：已编码的部分保持原样，
+                        # 未编码的字符由 httpx 补编码，避免 "%" 被二次编码成 "%25"
+                        entry["url"] = self._origin + url.raw_path.decode("ascii")
+                    listings.setdefault(key, []).append(entry)
+            parser.close()
+        # 没有视频的目录（只有字幕等）也要登记，否则 _cached_tree 找不到它的列举结果，
+        # 整棵树的缓存永远不命中；没有返回任何子项的目录不登记，由调用方另行列举
+        for href, d in collections.items():
+            if href in parents:
+                listings.setdefault(d, [])
+        return listings
+
+    def _disable_depth_infinity(self, reason: Exception):
+        """记录服务器不支持 Depth: infinity，之后直接逐层列举"""
+        log.info("服务器不支持 Depth: infinity，改为逐层列举 (%s)", reason)
+        self._depth_infinity = False
+
+    def _list_levels(self, dir_path: str) -> dict[str, list[dict]]:
+        """按层并发列举目录（BFS），返回 {目录: 条目列表}
+
+        根目录列举失败时直接抛出，由 list_videos 决定是否重试；子目录失败视为空目录
+        """
+        entries = self._ls(dir_path)
+        self._cache_put(dir_path, entries)
+        return self._walk_levels(self._subdirs(entries), {dir_path: entries})
+
+    def _walk_levels(self, pending: list[str],
+                     listings: dict[str, list[dict]]) -> dict[str, list[dict]]:
+        """从 pending 中的目录开始逐层向下列举，结果并入 listings 后返回"""
+        if not pending:
+            return listings
+        with ThreadPoolExecutor(max_workers=self.scan_workers) as ex:
+            while pending:
+                # 同一层的目录并发列举，总耗时约为 层数 × RTT
+                level = list(zip(pending, ex.map(self._ls_safe, pending)))
+                pending = []
+                for d, entries in level:
+                    if entries is None:
+                        entries = []  # 列举失败的目录视为空，且不写入缓存
+                    else:
+                        self._cache_put(d, entries)
+                    listings[d] = entries
+                    pending.extend(self._subdirs(entries))
+        return listings
+
+    def _ls_safe(self, dir_path: str) -> list[dict] | None:
+        """列举单个目录，失败时记录日志并返回 None"""
+        try:
+            return self._ls(dir_path)
         except httpx.ReadTimeout:
             log.warning("列举 %s 超时，暂返回空列表", dir_path)
-            return videos
         except Exception as e:
             log.warning("列举 %s 失败: %s", dir_path, e)
-            return videos
+        return None
 
-        for entry in entries:
-            name = entry.get("name", "")
-            entry_type = entry.get("type", "")
+    # ── 列举缓存 ─────────────────────────────────
 
-            if entry_type == "directory":
-                videos.extend(self._scan_recursive(name))
-                continue
+    def _cache_get(self, dir_path: str) -> list[dict] | None:
+        """取未过期的目录列举结果"""
+        cached = self._listing_cache.get(dir_path.strip("/"))
+        if cached is None or time.monotonic() - cached[0] > LISTING_CACHE_TTL:
+            return None
+        return cached[1]
 
-            # 检查文件扩展名
-            dot_idx = name.rfind(".")
-            ext = name[dot_idx:].lower() if dot_idx != -1 else ""
-            if ext not in self.extensions:
-                continue
+    def _cache_put(self, dir_path: str, entries: list[dict]):
+        self._listing_cache[dir_path.strip("/")] = (time.monotonic(), entries)
 
-            # 构建 FFmpeg 可用的 HTTP URL
-            encoded_path = quote(name, safe="/")
-            ffmpeg_url = f"{self.url}/{encoded_path}".replace("//", "/").replace(":/", "://")
+    def _cached_tree(self, dir_path: str) -> dict[str, list[dict]] | None:
+        """整棵目录树都在缓存中且未过期时返回列举结果，否则返回 None"""
+        listings: dict[str, list[dict]] = {}
+        stack = [dir_path]
+        while stack:
+            d = stack.pop()
+            entries = self._cache_get(d)
+            if entries is None:
+                return None
+            listings[d] = entries
+            stack.extend(self._subdirs(entries))
+        return listings
 
-            videos.append(VideoItem(
-                name=name.split("/")[-1],
-                ffmpeg_input=ffmpeg_url,
-                headers={"Authorization": self._auth_value},
-            ))
+    def _excluded(self, dir_name: str) -> bool:
+        """目录名（最后一级）是否在排除列表中"""
+        return dir_name.rstrip("/").rpartition("/")[2] in self.exclude_dirs
 
-        return videos
+    def _subdirs(self, entries: list[dict]) -> list[str]:
+        """条目中需要继续深入的子目录"""
+        return [
+            e.get("name", "") for e in entries
+            if e.get("type", "") == "directory" and not self._excluded(e.get("name", ""))
+        ]
+
+    def _collect(self, dir_path: str, listings: dict[str, list[dict]],
+                 out: list[VideoItem]):
+        """按原有深度优先顺序从列举结果中收集视频（显式栈，不受递归深度限制）"""
+        stack = deque([iter(listings.get(dir_path, ()))])
+        while stack:
+            for entry in stack[-1]:
+                name = entry.get("name", "")
+                entry_type = entry.get("type", "")
+
+                if entry_type == "directory":
+                    if not self._excluded(name):
+                        # 先处理子目录，之后从当前目录的下一个条目继续
+                        stack.append(iter(listings.get(name, ())))
+                        break
+                    continue
+
+                # 检查文件扩展名
+                if not self._ext_re.search(name):
+                    continue
+
+                out.append(VideoItem(
+                    name=name.split("/")[-1],
+                    ffmpeg_input=entry["url"],
+                    headers=self._auth_headers,
+                ))
+            else:
+                stack.pop()
@@ -1,27 +1,156 @@
 """FFmpeg 推流核心"""
 
+import atexit
+import functools
+import html
 import logging
 import os
+import queue
 import re
+import select
+import shutil
 import smtplib
 import socket
 import subprocess
 import threading
 import time
-import urllib.request
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from email.mime.text import MIMEText
-from urllib.parse import urlparse
+from urllib.parse import quote, urlparse
 
 import psutil
 import requests
 import yaml
+from requests.adapters import HTTPAdapter
+
+try:
+    import fcntl
+except ImportError:  # Windows 无 fcntl
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时回退 requests 自带的 json 解析
+    orjson = None
 
 from playlist import Playlist
 from bilibili_api import BilibiliAPI
 
 log = logging.getLogger(__name__)
 
+EMAIL_QUEUE_SIZE = 32  # 待发送邮件上限，满时丢弃最旧的通知
+SMTP_IDLE_CHECK = 30.0  # SMTP 连接空闲超过该秒数才先发 NOOP 探活
+PIPE_SIZE = 1 << 20  # 子进程管道缓冲区大小（Linux 默认 64 KiB）
+DECODER_KILL_TIMEOUT = 5.0  # 跳过/跳转时解码器收到 SIGTERM 后的最长退出等待（秒）
+REMOTE_IMAGE_TTL = 300.0  # 远程图片预检结果的缓存时间（秒）
+
+# 支持中文的字体候选路径
+_FONT_CANDIDATES = (
+    # Linux / Docker (Debian: fonts-wqy-zenhei)
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/truetype/wqy-zenhei/wqy-zenhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    # Windows
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simsun.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+)
+
+
+def _grow_pipe(stream):
+    """尽量把管道缓冲区扩大到 PIPE_SIZE，减少读写双方的阻塞与唤醒次数（仅 Linux）"""
+    set_size = getattr(fcntl, "F_SETPIPE_SZ", None)
+    if stream is None or set_size is None:
+        return
+    try:
+        fcntl.fcntl(stream.fileno(), set_size, PIPE_SIZE)
+    except OSError:
+        pass  # 超过 /proc/sys/fs/pipe-max-size 等情况保持默认大小
+
+
+_RE_SXXEYY = re.compile(r'S(\d+)E(\d+)', re.IGNORECASE)
+_RE_EP = re.compile(r'EP?(\d+)', re.IGNORECASE)
+# 自检报告每一行的 (图标, 颜色, 状态文字)，按检查结果查表
+_CHECK_STYLE = {True: ("✅", "#22c55e", "正常"), False: ("❌", "#ef4444", "异常")}
+# drawtext 文字转义：单引号与冒号一次替换完成
+_DRAWTEXT_ESCAPE = str.maketrans({"'": "\\'", ":": "\\:"})
+# 推流码验证时 FFmpeg 输出中的失败特征，出现即可判定失败，无需等到空流推完
+_RE_PUSH_FAILED = re.compile(rb"Server returned|Connection refused|Unauthorized|Error opening output")
+
+
+@functools.lru_cache(maxsize=512)
+def _extract_episode(video_name: str) -> str:
+    """从文件名提取集数信息（纯函数，按文件名缓存）"""
+    if not video_name:
+        return ""
+    m = _RE_SXXEYY.search(video_name)
+    if m:
+        return f"第{int(m.group(1))}季 第{int(m.group(2))}集"
+    m = _RE_EP.search(video_name)
+    if m:
+        return f"第{int(m.group(1))}集"
+    return os.path.splitext(video_name)[0]
+
+
+@functools.lru_cache(maxsize=8)
+def _rtmp_endpoint(rtmp_url: str) -> tuple[str, int]:
+    """解析 RTMP 地址的主机与端口（按地址缓存，推流码更新后自动换新）"""
+    parsed = urlparse(rtmp_url)
+    return parsed.hostname or "live-push.bilivideo.com", parsed.port or 1935
+
+
+def _join_cmd(cmd: list[str], limit: int) -> str:
+    """拼接命令行用于日志，只拼到 limit 个字符为止（滤镜链可能长达数 KB）"""
+    parts: list[str] = []
+    size = 0
+    for arg in cmd:
+        parts.append(arg)
+        size += len(arg) + 1
+        if size > limit:
+            break
+    return " ".join(parts)[:limit]
+
+
+def _ps_process(pid: int) -> psutil.Process | None:
+    """获取子进程的 psutil 句柄，并预热 CPU 占用的差值基准"""
+    try:
+        proc = psutil.Process(pid)
+        proc.cpu_percent(interval=None)  # 首次调用只记录基准，返回 0
+        return proc
+    except psutil.Error:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_bin() -> str:
+    """FFmpeg 可执行文件的完整路径（进程内只在 PATH 中查找一次，找不到时交给系统查找）"""
+    return shutil.which("ffmpeg") or "ffmpeg"
+
+
+@functools.lru_cache(maxsize=1)
+def _find_font() -> str | None:
+    """查找支持中文的字体文件（进程内只扫描一次，未找到的结果同样缓存）"""
+    for path in _FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path.replace("\\", "/")
+    return None
+
+
+@dataclass(slots=True, frozen=True)
+class _DecoderTemplate:
+    """解码器命令中与具体视频无关的部分（画面设置变更前保持不变）"""
+    extra_inputs: list[str]   # 图片与挂机视频的 -i 参数
+    filter_head: str          # 缩放/图片/画中画叠加部分的滤镜链
+    filter_stream: str        # filter_head 输出的流标签
+    overlay_texts: list[str]  # 配置文件中的文字叠加
+    clock: str                # 实时时钟滤镜（未启用时为空）
+    tail: list[str]           # -map 与编码、输出参数
+
 
 class Streamer:
     def __init__(self, playlist: Playlist, config: dict):
@@ -36,6 +165,16 @@ class Streamer:
         self.clock_cfg = config.get("clock", {})
         self.resilience = config.get("resilience", {})
         self.email_cfg = config.get("email", {})
+        self._smtp: smtplib.SMTP | None = None  # 复用的 SMTP 连接（已登录）
+        self._smtp_last_use: float = 0.0  # 上次成功使用 SMTP 连接的时间
+        self._smtp_lock = threading.Lock()
+        atexit.register(self._close_smtp)
+        # 单个后台线程按序发送邮件，失败风暴时也不会无限制地创建线程
+        self._email_queue: queue.Queue = queue.Queue(maxsize=EMAIL_QUEUE_SIZE)
+        self._email_dropped = 0
+        # 发送线程在第一封通知入队时才启动，面板上后开启邮件通知也能正常发送
+        self._email_worker_started = False
+        self._email_worker_lock = threading.Lock()
 
         self._process: subprocess.Popen | None = None  # 当前解码器进程
         self._pusher_process: subprocess.Popen | None = None  # 持久推流进程
@@ -45,9 +184,17 @@ class Streamer:
         self._seek_position: float | None = None  # 用户拖动进度条跳转目标
         self._thread: threading.Thread | None = None
         self._lock = threading.Lock()
+        self._decoder_template: _DecoderTemplate | None = None  # 惰性构建，画面设置变更时清空
+        self._missing_images: set[str] = set()  # 已告警过的缺失图片，文件恢复后移除
+        self._remote_images: dict[str, tuple[float, bool]] = {}  # 远程图片预检结果 {URL: (检查时间, 是否可用)}
 
         # 缓存字体路径（只查找一次）
-        self._font_path: str | None = self._find_font()
+        self._font_path: str | None = _find_font()
+        # drawtext 的 fontfile 参数（路径转义只做一次，所有文字滤镜共用）
+        self._font_suffix = ""
+        if self._font_path:
+            safe_path = self._font_path.replace(":", "\\:")  # _find_font 已统一为 / 分隔
+            self._font_suffix = f":fontfile='{safe_path}'"
 
         # 状态信息（供 Web 面板读取）
         self.current_video: str = ""
@@ -62,9 +209,19 @@ class Streamer:
         self.bitrate: str = ""           # 推流码率
         self.speed: str = ""             # 编码速度
         self._seek_offset: float = 0.0   # -ss 跳转偏移量
+        # (采样时间, 系统 CPU%, 系统内存%, 解码器 CPU%, 解码器内存 MB)
+        self._sys_stats: tuple[float, float, float, float, int] = (0.0, 0.0, 0.0, 0.0, 0)
+        self._decoder_ps: psutil.Process | None = None  # 当前解码器的 psutil 句柄
         
+        # 远程图片预检、B站自动重连与直播间状态查询共用的会话，复用 TCP/TLS 连接
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._http.mount("https://", adapter)
+        self._http.mount("http://", adapter)
+
         # B站API相关配置缓存
         self._bili_cfg = config.get("bilibili", {})
+        self._bili_api: BilibiliAPI | None = None  # 复用同一实例以共享连接池
 
     # ── 公共 API ──────────────────────────────────
 
@@ -73,12 +230,10 @@ class Streamer:
         if self._running:
             return
 
-        if not self._font_path:
-            self._font_path = self._find_font()
-            if self._font_path:
-                log.info("Using font: %s", self._font_path)
-            else:
-                log.warning("No font found! OSD might fail.")
+        if self._font_path:
+            log.info("Using font: %s", self._font_path)
+        else:
+            log.warning("No font found! OSD might fail.")
 
         self._running = True
         self.start_time = datetime.now()
@@ -87,6 +242,9 @@ class Streamer:
         base_delay = self.resilience.get("retry_delay", 5)
         max_delay = self.resilience.get("max_retry_delay", 60)
         max_retries = self.resilience.get("max_retries", 0)
+        # 关闭后解码器 stderr 直接丢弃，不再读取解析（面板不显示进度/码率，无头部署可省下这部分开销）；
+        # 播放位置改按墙钟估算，断点续播仍然可用，但会偏差解码器启动/缓冲的耗时
+        progress_reporting = self.resilience.get("progress_reporting", True)
 
         log.info("=" * 50)
         log.info("B 站 24 小时推流服务已启动")
@@ -100,20 +258,14 @@ class Streamer:
         bili_room = self._bili_cfg.get("room_id")
         if bili_cookie and bili_room:
             log.info("检测到 B 站 Cookie，正在自动请求开播...")
-            bili_api = BilibiliAPI(bili_room, bili_cookie)
-            ok, url, code, msg = bili_api.start_live()
+            ok, url, code, msg = self._get_bili_api().start_live()
             if ok and url and code:
                 with self._lock:
                     self.stream_cfg["rtmp_url"] = url
                     self.stream_cfg["stream_key"] = code
                 log.info("获取最新推流码成功，正在同步 config.yaml")
                 try:
-                    with open("config.yaml", "r", encoding="utf-8") as f:
-                        fc = yaml.safe_load(f)
-                    fc["stream"]["rtmp_url"] = url
-                    fc["stream"]["stream_key"] = code
-                    with open("config.yaml", "w", encoding="utf-8") as f:
-                        yaml.dump(fc, f, allow_unicode=True, sort_keys=False)
+                    self._persist_stream_config(url, code)
                 except Exception as e:
                     log.warning("写入 config.yaml 异常: %s", e)
             else:
@@ -165,12 +317,15 @@ class Streamer:
                     self._process = subprocess.Popen(
                         cmd,
                         stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
+                        stderr=subprocess.PIPE if progress_reporting else subprocess.DEVNULL,
                     )
+                    _grow_pipe(self._process.stdout)
+                    _grow_pipe(self._process.stderr)
+                    self._decoder_ps = _ps_process(self._process.pid)
                     # 启动管道线程：解码器 stdout → 推流器 stdin
                     self._pipe_thread = threading.Thread(target=self._pipe_data, daemon=True)
                     self._pipe_thread.start()
-                    # 从解码器 stderr 读取进度
+                    # 从解码器 stderr 读取进度（未开启进度上报时按墙钟估算）
                     self._read_output()
                     returncode = self._process.wait()
                     self._pipe_thread.join(timeout=5)
@@ -197,6 +352,7 @@ class Streamer:
 
                     video_retry += 1
                     self._total_failures += 1
+                    self.reload_layout()  # 图片/挂机视频可能已失效，重试时重新检查
 
                     # 立即将当前秒数写入 progress.json，确保断点精确
                     with self._lock:
@@ -246,7 +402,7 @@ class Streamer:
         if self._process and self._process.poll() is None:
             self._skip_requested = True
             log.info("⏭ 跳过当前视频")
-            self._process.terminate()
+            self._terminate_decoder()
 
     def play(self, index: int) -> bool:
         """跳转到指定索引的视频"""
@@ -257,7 +413,7 @@ class Streamer:
         # 终止当前进程，主循环会自动取 jump_to 设置的视频
         if self._process and self._process.poll() is None:
             self._skip_requested = True
-            self._process.terminate()
+            self._terminate_decoder()
         return True
 
     def seek(self, position: float) -> bool:
@@ -272,13 +428,34 @@ class Streamer:
         log.info("⏩ 跳转到 %.1f 秒", position)
         # 终止当前解码器，主循环会用 _seek_position 重建
         if self._process.poll() is None:
-            self._process.terminate()
+            self._terminate_decoder()
         return True
 
+    def _terminate_decoder(self):
+        """结束当前解码器，主循环随即切换视频
+
+        读取线程要等到解码器退出、管道 EOF 才会返回，若 FFmpeg 收尾卡住（如网络输入无响应），
+        超时后强制 kill，保证下一个视频及时开始；不阻塞调用方（Web 请求线程）。
+        """
+        proc = self._process
+        if proc is None:
+            return
+        proc.terminate()
+
+        def kill_if_alive():
+            if proc.poll() is None:
+                log.warning("解码器 %.0f 秒内未退出，强制结束", DECODER_KILL_TIMEOUT)
+                proc.kill()
+
+        timer = threading.Timer(DECODER_KILL_TIMEOUT, kill_if_alive)
+        timer.daemon = True
+        timer.start()
+
     def stop(self):
         """停止推流"""
         self._running = False
         self._cleanup()
+        self.playlist.flush_progress()
 
         # === 新增：全面关播 ===
         bili_cookie = self._bili_cfg.get("cookie")
@@ -286,11 +463,16 @@ class Streamer:
         if bili_cookie and bili_room:
             try:
                 log.info("停止推流，尝试向 B 站发送关播请求...")
-                bili_api = BilibiliAPI(bili_room, bili_cookie)
-                bili_api.stop_live()
+                self._get_bili_api().stop_live()
             except Exception as e:
                 log.warning("自动关播异常: %s", e)
 
+    def _get_bili_api(self) -> BilibiliAPI:
+        """获取（首次时创建）B 站开/关播 API 客户端"""
+        if self._bili_api is None:
+            self._bili_api = BilibiliAPI(self._bili_cfg["room_id"], self._bili_cfg["cookie"])
+        return self._bili_api
+
     @property
     def is_running(self) -> bool:
         return self._running
@@ -305,83 +487,132 @@ class Streamer:
             minutes, seconds = divmod(remainder, 60)
             uptime = f"{hours}h {minutes}m {seconds}s"
 
-        # 系统监控
-        cpu = psutil.cpu_percent(interval=0)
-        mem = psutil.virtual_memory().percent
-
-        with self._lock:
-            return {
-                "running": self._running,
-                "current_video": self.current_video,
-                "videos_played": self.videos_played,
-                "uptime": uptime,
-                "playlist_total": self.playlist.total,
-                "progress": round(self.progress, 1),
-                "duration": round(self.duration, 1),
-                "current_time": round(self.current_time, 1),
-                "bitrate": self.bitrate,
-                "speed": self.speed,
-                "cpu_percent": cpu,
-                "memory_percent": mem,
-            }
+        # 系统监控（1 秒内的重复请求复用上次采样）
+        now = time.monotonic()
+        ts, cpu, mem, ff_cpu, ff_mem = self._sys_stats
+        if now - ts > 1.0:
+            cpu = psutil.cpu_percent(interval=0)
+            mem = psutil.virtual_memory().percent
+            # 解码器进程只读 /proc/<pid> 下的文件，开销与 CPU 核数无关
+            ff_cpu, ff_mem = 0.0, 0
+            proc = self._decoder_ps
+            if proc is not None:
+                try:
+                    with proc.oneshot():
+                        ff_cpu = proc.cpu_percent(interval=None)
+                        ff_mem = proc.memory_info().rss >> 20
+                except psutil.Error:  # 进程已退出
+                    pass
+            self._sys_stats = (now, cpu, mem, ff_cpu, ff_mem)
+
+        # 各字段逐个读取（单次属性读取是原子的），不与推流线程争锁
+        return {
+            "running": self._running,
+            "current_video": self.current_video,
+            "videos_played": self.videos_played,
+            "uptime": uptime,
+            "playlist_total": self.playlist.total,
+            "progress": round(self.progress, 1),
+            "duration": round(self.duration, 1),
+            "current_time": round(self.current_time, 1),
+            "bitrate": self.bitrate,
+            "speed": self.speed,
+            "cpu_percent": cpu,
+            "memory_percent": mem,
+            "ffmpeg_cpu_percent": ff_cpu,
+            "ffmpeg_memory_mb": ff_mem,
+        }
 
     # ── FFmpeg 命令构建 ───────────────────────────
 
+    def reload_layout(self):
+        """画面设置（台标/图片/文字/时钟/挂机视频）变更后调用，下次构建命令时重新生成模板
+
+        解码失败后也会调用：远程图片可能已失效，因此丢弃缓存的"可用"结果强制重新预检；
+        "不可用"的结果保留到过期，避免失败重试时每次都等待超时
+        """
+        self._decoder_template = None
+        self._remote_images = {url: r for url, r in self._remote_images.items() if not r[1]}
+
     def _build_decoder_cmd(self, input_path: str, headers: dict | None = None, video_name: str = "", seek_position: float = 0.0) -> list[str]:
         """构建解码器 FFmpeg 命令（输出 MPEG-TS 到 stdout）"""
-        v = self.video_cfg
-        a = self.audio_cfg
-        w, h = v.get("width", 1920), v.get("height", 1080)
-        
-        cmd = ["ffmpeg", "-y"]
+        t = self._decoder_template
+        if t is None:
+            t = self._decoder_template = self._compile_decoder_template()
+
+        # 进度以 key=value 形式写到 stderr（stdout 是 MPEG-TS 数据），不再输出人类可读的统计行
+        cmd = [_ffmpeg_bin(), "-y", "-nostats", "-progress", "pipe:2"]
 
         # 1. 主视频输入（如有断点续播位置，在 -i 前加 -ss）
         if headers and "Authorization" in headers:
             cmd += ["-headers", f"Authorization: {headers['Authorization']}\r\n"]
         if seek_position > 0:
             cmd += ["-ss", f"{seek_position:.1f}"]
-        cmd += ["-re", "-i", input_path]
+        cmd += ["-re", "-i", input_path, *t.extra_inputs]
 
-        # 2. 收集图片输入 (Logo + Images)
+        # 2. 滤镜链：模板部分 + 文字（配置文字、右上角集数、实时时钟）
+        text_parts = list(t.overlay_texts)
+        episode = self._extract_episode(video_name)
+        if episode:
+            text_parts.append(self._drawtext(
+                text=episode, fontsize=28, fontcolor="white@0.8",
+                x="w-tw-30", y="60", borderw=1,
+            ))
+        if t.clock:
+            text_parts.append(t.clock)
+        text_filters = ",".join(text_parts) or "null"
+        fc = f"{t.filter_head}{t.filter_stream}{text_filters}[out]"
+
+        cmd += ["-filter_complex", fc, *t.tail]
+
+        if log.isEnabledFor(logging.INFO):
+            log.info("解码器 CMD: %s", _join_cmd(cmd, 500))
+        return cmd
+
+    def _compile_decoder_template(self) -> _DecoderTemplate:
+        """根据当前画面与编码配置生成解码器命令模板（含图片可用性检查）"""
+        v = self.video_cfg
+        a = self.audio_cfg
+        w, h = v.get("width", 1920), v.get("height", 1080)
+
+        extra_inputs: list[str] = []
+
+        # 1. 收集图片输入 (Logo + Images)
         image_inputs = []
         if self.logo_cfg and self.logo_cfg.get("path"):
              image_inputs.append(self.logo_cfg)
         if self.images_cfg:
              image_inputs.extend(self.images_cfg)
 
+        # 预检远程图片是否可达（并发请求，结果缓存）
+        remote_ok = self._check_remote_images(
+            [img["path"] for img in image_inputs if img.get("path", "").startswith("http")]
+        )
+
         valid_images = []
         for img in image_inputs:
             path = img.get("path", "")
             if not path:
                 continue
             if path.startswith("http"):
-                # 预检远程图片是否可达
-                try:
-                    resp = requests.head(path, timeout=3, allow_redirects=True)
-                    if resp.status_code < 400:
-                        cmd += ["-i", path]
-                        valid_images.append(img)
-                    else:
-                        log.warning("远程图片不可用 (HTTP %d): %s", resp.status_code, path)
-                except Exception as e:
-                    log.warning("远程图片不可达，已跳过: %s (%s)", path, e)
-            elif os.path.exists(path):
-                cmd += ["-i", path]
+                if remote_ok[path]:
+                    extra_inputs += ["-i", path]
+                    valid_images.append(img)
+            elif self._image_exists(path):
+                extra_inputs += ["-i", path]
                 valid_images.append(img)
-            else:
-                log.warning("图片文件不存在: %s", path)
 
-        # 3. 挂机视频输入 (画中画，循环播放)
+        # 2. 挂机视频输入 (画中画，循环播放)
         webcam_path = self.webcam_cfg.get("path", "")
         webcam_input_idx = None
         if self.webcam_cfg.get("enabled", True) and webcam_path and os.path.exists(webcam_path):
             webcam_input_idx = 1 + len(valid_images)  # 紧跟在图片输入之后
-            cmd += ["-stream_loop", "-1", "-i", webcam_path]
+            extra_inputs += ["-stream_loop", "-1", "-i", webcam_path]
             log.info("挂机视频已加载: %s (input %d)", webcam_path, webcam_input_idx)
 
-        # 4. 滤镜链
+        # 3. 滤镜链
         # [0:v] 缩放并填充黑边 -> [base]
-        fc = f"[0:v]scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2[base];"
+        fc = [f"[0:v]scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2[base];"]
         
         current_stream = "[base]"
         
@@ -394,14 +625,14 @@ class Streamer:
             opacity = img.get("opacity", 1.0)
             
             # 缩放图片
-            fc += f"[{idx}:v]scale=-1:{iw},format=rgba"
+            fc.append(f"[{idx}:v]scale=-1:{iw},format=rgba")
             if opacity < 1.0:
-                 fc += f",colorchannelmixer=aa={opacity}"
-            fc += f"[img{i}];"
+                fc.append(f",colorchannelmixer=aa={opacity}")
+            fc.append(f"[img{i}];")
             
             # 叠加
             next_stream = f"[v{i}]"
-            fc += f"{current_stream}[img{i}]overlay=x={ix}:y={iy}{next_stream};"
+            fc.append(f"{current_stream}[img{i}]overlay=x={ix}:y={iy}{next_stream};")
             current_stream = next_stream
 
         # 叠加挂机视频画中画 (右下角)
@@ -410,27 +641,19 @@ class Streamer:
             cam_x = self.webcam_cfg.get("x", f"W-w-20")
             cam_y = self.webcam_cfg.get("y", f"H-h-20")
             cam_opacity = self.webcam_cfg.get("opacity", 1.0)
-            fc += f"[{webcam_input_idx}:v]scale=-1:{cam_h},format=rgba"
+            fc.append(f"[{webcam_input_idx}:v]scale=-1:{cam_h},format=rgba")
             if cam_opacity < 1.0:
-                fc += f",colorchannelmixer=aa={cam_opacity}"
-            fc += f"[cam];"
+                fc.append(f",colorchannelmixer=aa={cam_opacity}")
+            fc.append("[cam];")
             next_stream = "[vcam]"
-            fc += f"{current_stream}[cam]overlay=x={cam_x}:y={cam_y}{next_stream};"
+            fc.append(f"{current_stream}[cam]overlay=x={cam_x}:y={cam_y}{next_stream};")
             current_stream = next_stream
 
-        # 叠加文字
-        text_filters = self._collect_text_filters(video_name)
-        if text_filters:
-            fc += f"{current_stream}{text_filters}[out]"
-        else:
-            fc += f"{current_stream}null[out]"
-
-        cmd += ["-filter_complex", fc, "-map", "[out]", "-map", "0:a"]
-
         # 编码参数
         bitrate = v.get("bitrate", "3000k")
         fps = v.get("fps", 30)
-        cmd += [
+        tail = [
+            "-map", "[out]", "-map", "0:a",
             "-c:v", "libx264", "-preset", v.get("preset", "veryfast"), "-profile:v", "baseline",
             "-b:v", bitrate, "-maxrate", bitrate, "-bufsize", f"{int(bitrate.replace('k', '')) * 2}k",
             "-r", str(fps), "-g", str(fps * 2), "-pix_fmt", "yuv420p",
@@ -438,15 +661,21 @@ class Streamer:
             "-mpegts_flags", "resend_headers",
             "-f", "mpegts", "pipe:1",
         ]
-        
-        log.info("解码器 CMD: %s", ' '.join(cmd)[:500])
-        return cmd
+
+        return _DecoderTemplate(
+            extra_inputs=extra_inputs,
+            filter_head="".join(fc),
+            filter_stream=current_stream,
+            overlay_texts=self._collect_overlay_texts(),
+            clock=self._build_clock_filter(),
+            tail=tail,
+        )
 
     def _build_pusher_cmd(self) -> list[str]:
         """构建持久推流器命令（从 stdin 读 MPEG-TS，推 FLV 到 RTMP）"""
         rtmp_url = self.stream_cfg["rtmp_url"] + self.stream_cfg["stream_key"]
         return [
-            "ffmpeg", "-y",
+            _ffmpeg_bin(), "-y",
             "-fflags", "+genpts+discardcorrupt",
             "-f", "mpegts", "-i", "pipe:0",
             "-c", "copy",
@@ -461,11 +690,49 @@ class Streamer:
 
     # ── 滤镜构建 ─────────────────────────────────
 
-    def _collect_text_filters(self, video_name: str) -> str:
-        """收集所有文字滤镜，返回逗号分隔的滤镜链"""
-        parts: list[str] = []
+    def _check_remote_images(self, urls: list[str]) -> dict[str, bool]:
+        """并发预检远程图片，返回 {URL: 是否可用}；结果缓存 5 分钟，失败重建模板时不再逐个等待超时"""
+        now = time.monotonic()
+        result: dict[str, bool] = {}
+        stale: list[str] = []
+        for url in dict.fromkeys(urls):
+            cached = self._remote_images.get(url)
+            if cached and now - cached[0] < REMOTE_IMAGE_TTL:
+                result[url] = cached[1]
+            else:
+                stale.append(url)
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(8, len(stale))) as ex:
+                for url, ok in zip(stale, ex.map(self._head_image, stale)):
+                    self._remote_images[url] = (now, ok)
+                    result[url] = ok
+        return result
+
+    def _head_image(self, url: str) -> bool:
+        """HEAD 请求检查单张远程图片是否可用"""
+        try:
+            resp = self._http.head(url, timeout=3, allow_redirects=True)
+        except Exception as e:
+            log.warning("远程图片不可达，已跳过: %s (%s)", url, e)
+            return False
+        if resp.status_code >= 400:
+            log.warning("远程图片不可用 (HTTP %d): %s", resp.status_code, url)
+            return False
+        return True
 
-        # 配置文件中的文字叠加
+    def _image_exists(self, path: str) -> bool:
+        """检查本地图片是否存在；同一缺失文件只在首次发现时告警，避免每次重建模板刷屏"""
+        if os.path.exists(path):
+            self._missing_images.discard(path)
+            return True
+        if path not in self._missing_images:
+            self._missing_images.add(path)
+            log.warning("图片文件不存在: %s", path)
+        return False
+
+    def _collect_overlay_texts(self) -> list[str]:
+        """收集配置文件中的文字叠加滤镜"""
+        parts: list[str] = []
         overlays = self.overlay_cfg if isinstance(self.overlay_cfg, list) else (
             [self.overlay_cfg] if self.overlay_cfg else []
         )
@@ -480,43 +747,19 @@ class Streamer:
                 y=item.get("y", 20),
                 borderw=item.get("borderw", 2),
             ))
-
-        # 右上角集数
-        episode = self._extract_episode(video_name)
-        if episode:
-            parts.append(self._drawtext(
-                text=episode, fontsize=28, fontcolor="white@0.8",
-                x="w-tw-30", y="60", borderw=1,
-            ))
-
-        # 右上角实时时钟
-        clock = self._build_clock_filter()
-        if clock:
-            parts.append(clock)
-
-        return ",".join(parts)
+        return parts
 
     def _drawtext(self, text: str, fontsize: int, fontcolor: str,
                   x, y, borderw: int = 2) -> str:
         """构建单个 drawtext 滤镜"""
-        safe_text = text.replace("'", "\\'").replace(":", "\\:")
+        safe_text = text.translate(_DRAWTEXT_ESCAPE)
         dt = f"drawtext=text='{safe_text}':fontsize={fontsize}:fontcolor={fontcolor}:x={x}:y={y}:borderw={borderw}"
-        if self._font_path:
-            safe_path = self._font_path.replace("\\", "/").replace(":", "\\:")
-            dt += f":fontfile='{safe_path}'"
-        return dt
+        return dt + self._font_suffix
 
-    def _extract_episode(self, video_name: str) -> str:
+    @staticmethod
+    def _extract_episode(video_name: str) -> str:
         """从文件名提取集数信息"""
-        if not video_name:
-            return ""
-        m = re.search(r'S(\d+)E(\d+)', video_name, re.IGNORECASE)
-        if m:
-            return f"第{int(m.group(1))}季 第{int(m.group(2))}集"
-        m = re.search(r'EP?(\d+)', video_name, re.IGNORECASE)
-        if m:
-            return f"第{int(m.group(1))}集"
-        return os.path.splitext(video_name)[0]
+        return _extract_episode(video_name)
 
     def _build_clock_filter(self) -> str:
         """构建右上角实时时钟 drawtext 滤镜"""
@@ -529,45 +772,20 @@ class Streamer:
         fmt = self.clock_cfg.get("format", "%H\\:%M\\:%S")
 
         dt = f"drawtext=text='%{{localtime\\:{fmt}}}':fontsize={fontsize}:fontcolor={fontcolor}:x={x}:y={y}:borderw=1"
-        if self._font_path:
-            safe_path = self._font_path.replace("\\", "/").replace(":", "\\:")
-            dt += f":fontfile='{safe_path}'"
-        return dt
+        return dt + self._font_suffix
 
     # ── 内部方法 ──────────────────────────────────
 
-    @staticmethod
-    def _find_font() -> str | None:
-        """查找支持中文的字体文件"""
-        candidates = [
-            # Linux / Docker (Debian: fonts-wqy-zenhei)
-            "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-            "/usr/share/fonts/truetype/wqy-zenhei/wqy-zenhei.ttc",
-            "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-            "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-            # Windows
-            "C:/Windows/Fonts/msyh.ttc",
-            "C:/Windows/Fonts/simsun.ttc",
-            "C:/Windows/Fonts/simhei.ttf",
-        ]
-        for path in candidates:
-            if os.path.exists(path):
-                return path.replace("\\", "/")
-        return None
-
-    # 正则：匹配 FFmpeg 输出中的 Duration    # 匹配进度和时长（忽略挂机视频等其它的 stream 干扰）
+    # 正则：匹配 FFmpeg 输出中的 Duration（忽略挂机视频等其它的 stream 干扰）
     # ffmpeg 输出的主视频时长通常是第一个 Duration:
-    _RE_DURATION = re.compile(r"Duration: (\d+):(\d+):(\d+)\.(\d+)")
-    # ffmpeg 真实的融合进度行往往带有 q= xxx 或者 frame= xxx
-    _RE_PROGRESS = re.compile(r"(?:frame=|q=).*time=(\d+):(\d+):(\d+)\.(\d+)")
-    _RE_BITRATE = re.compile(r"bitrate=\s*([\d.]+\s*kbits/s)")
-    _RE_SPEED = re.compile(r"speed=\s*([\d.]+x)")
+    _RE_DURATION = re.compile(rb"Duration: (\d+:\d+:\d+\.\d+)")
+    # 解码器需要打印的关键日志行，一次扫描代替逐个关键字判断
+    _RE_LOG_KEYWORDS = re.compile(rb"[Ee]rror|Warning|Opening|Output|Stream")
 
     def _start_pusher(self):
         """启动持久推流器进程"""
         cmd = self._build_pusher_cmd()
-        log.info("启动推流器: %s", ' '.join(cmd)[:300])
+        log.info("启动推流器: %s", _join_cmd(cmd, 300))
         self._last_pusher_heartbeat = time.time()
         
         # 强制清理遗留推流器
@@ -584,6 +802,8 @@ class Streamer:
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
         )
+        _grow_pipe(self._pusher_process.stdin)
+        _grow_pipe(self._pusher_process.stdout)
         # 后台读取推流器日志
         threading.Thread(target=self._read_pusher_output, daemon=True).start()
 
@@ -628,61 +848,117 @@ class Streamer:
         except Exception:
             pass
 
+    def _iter_lines(self, stream) -> Iterator[bytes]:
+        """按 \\r 或 \\n 切分子进程输出（FFmpeg 的进度行以 \\r 结尾）
+
+        POSIX 下用 select + os.read 批量读取，每 0.5 秒检查一次 _running，停止时无需等到 EOF；
+        Windows 管道不支持 select，退回逐行阻塞读取。
+        """
+        if os.name == "nt":
+            for line in stream:
+                if not self._running:
+                    return
+                yield line
+            return
+
+        fd = stream.fileno()
+        os.set_blocking(fd, False)
+        buf = bytearray()
+        while self._running:
+            ready, _, _ = select.select([fd], [], [], 0.5)
+            if not ready:
+                continue
+            try:
+                chunk = os.read(fd, 65536)
+            except BlockingIOError:
+                continue
+            if not chunk:
+                break
+            buf += chunk
+            lines = buf.splitlines()
+            # 末尾不完整的一行留到下次拼接
+            buf = bytearray() if buf.endswith((b"\r", b"\n")) else lines.pop()
+            for line in lines:
+                if line:
+                    yield line
+        if buf:
+            yield buf
+
+    @staticmethod
+    def _parse_hms(value: bytes) -> float:
+        """解析 FFmpeg 的 HH:MM:SS.xx 时间为秒数"""
+        h, m, sec = value.split(b":")
+        return int(h) * 3600 + int(m) * 60 + float(sec)
+
+    def _track_wall_clock(self):
+        """未开启进度上报时，按解码器启动后经过的时间估算播放位置（-re 以实时速度读取输入）"""
+        process = self._process
+        started = time.monotonic()
+        last_progress_save = started
+        while self._running:
+            try:
+                process.wait(timeout=1)
+                return
+            except subprocess.TimeoutExpired:
+                pass
+            now = time.monotonic()
+            current = self._seek_offset + (now - started)
+            self.current_time = current
+            # 与 _read_output 一致，每 10 秒保存一次秒级进度
+            if now - last_progress_save >= 10:
+                self.playlist.save_progress_with_position(current)
+                last_progress_save = now
+
     def _read_output(self):
         """读取解码器 stderr，解析进度和码率"""
-        if not self._process or not self._process.stderr:
+        if not self._process:
+            return
+        if not self._process.stderr:
+            self._track_wall_clock()
             return
         last_progress_save = time.time()
-        for line in self._process.stderr:
+        log_enabled = log.isEnabledFor(logging.WARNING)
+        for line in self._iter_lines(self._process.stderr):
             if not self._running:
                 break
-            text = line.decode("utf-8", errors="replace").strip()
 
-            # 解析视频总时长
-            m = self._RE_DURATION.search(text)
-            if m:
-                with self._lock:
-                    if self.duration == 0:
-                        self.duration = (
-                            int(m.group(1)) * 3600 + int(m.group(2)) * 60
-                            + int(m.group(3)) + int(m.group(4)) / 100
-                        )
-
-            # 解析当前播放位置
-            m = self._RE_PROGRESS.search(text)
-            if m:
-                relative_time = (
-                    int(m.group(1)) * 3600 + int(m.group(2)) * 60
-                    + int(m.group(3)) + int(m.group(4)) / 100
-                )
-                with self._lock:
+            # -progress 输出的 key=value 行，按 key 分派，无需正则
+            # 以下字段只由推流线程写入，单个属性赋值本身是原子的，无需加锁
+            key, sep, value = line.partition(b"=")
+            if sep:
+                if key == b"out_time_us":
+                    # 解析当前播放位置
+                    if not value.isdigit():  # 开始阶段为 N/A
+                        continue
                     # 加上 seek 偏移量，得到视频绝对时间
-                    current = self._seek_offset + relative_time
+                    current = self._seek_offset + int(value) / 1_000_000
                     self.current_time = current
-                    if self.duration > 0:
-                        self.progress = min(current / self.duration * 100, 100)
-
-                # 每 10 秒保存一次秒级进度
-                now = time.time()
-                if now - last_progress_save >= 10:
-                    self.playlist.save_progress_with_position(current)
-                    last_progress_save = now
-
-            # 解析推流码率
-            m = self._RE_BITRATE.search(text)
-            if m:
-                with self._lock:
-                    self.bitrate = m.group(1)
+                    duration = self.duration
+                    if duration > 0:
+                        self.progress = min(current / duration * 100, 100)
+
+                    # 每 10 秒保存一次秒级进度
+                    now = time.time()
+                    if now - last_progress_save >= 10:
+                        self.playlist.save_progress_with_position(current)
+                        last_progress_save = now
+                    continue
+                if key == b"bitrate" or key == b"speed":
+                    # 解析推流码率 / 编码速度（开始阶段为 N/A，保留上一次的值）
+                    value = value.strip()
+                    if value != b"N/A":
+                        setattr(self, key.decode(), value.decode())
+                    continue
 
-            # 解析编码速度
-            m = self._RE_SPEED.search(text)
-            if m:
-                with self._lock:
-                    self.speed = m.group(1)
+            # 解析视频总时长
+            if self.duration == 0:
+                m = self._RE_DURATION.search(line)
+                if m:
+                    self.duration = self._parse_hms(m.group(1))
 
-            # 关键日志输出
-            if any(kw in text for kw in ("Error", "error", "Warning", "Opening", "Output", "Stream")):
-                log.warning("[解码器] %s", text)
+            # 关键日志输出（只有需要打印的行才解码；日志级别关闭时跳过匹配）
+            if log_enabled and self._RE_LOG_KEYWORDS.search(line):
+                log.warning("[解码器] %s", line.decode("utf-8", errors="replace").strip())
 
     def _cleanup(self):
         """清理解码器和推流器进程"""
@@ -734,8 +1010,8 @@ class Streamer:
             log.info("%s %s: %s", icon, item["name"], item["detail"])
 
         # 生成 HTML 并发送邮件
-        html = self._format_report_html(report)
-        self._notify_email("🔍 推流自检报告", html, is_html=True)
+        report_html = self._format_report_html(report)
+        self._notify_email("🔍 推流自检报告", report_html, is_html=True)
 
         # 如果 RTMP 连接和推流码都失败，或直播间未开播，尝试自动重新获取推流码并开播
         rtmp_ok = next((c["ok"] for c in report["checks"] if c["id"] == "rtmp"), True)
@@ -794,7 +1070,7 @@ class Streamer:
         
         log.info("🔄 正在请求 B 站开启直播...")
         try:
-            resp = requests.post(url, headers=headers, data=data, timeout=10)
+            resp = self._http.post(url, headers=headers, data=data, timeout=10)
             resp_json = resp.json()
             
             # code 0 直接成功
@@ -812,7 +1088,7 @@ class Streamer:
                     <h2 style="color:#fb7299">系统触发了重新开播，但需要进行人脸认证</h2>
                     <p style="color:#666">请用手机浏览器的扫一扫或者 B 站 APP 扫描并在手机端完成认证：</p>
                     <div style="margin:20px 0;">
-                        <img src="https://api.qrserver.com/v1/create-qr-code/?size=200x200&data={urllib.parse.quote(qr_url)}" alt="二维码" />
+                        <img src="https://api.qrserver.com/v1/create-qr-code/?size=200x200&data={quote(qr_url)}" alt="二维码" />
                     </div>
                     <p style="color:#999;font-size:12px;">如果无法显示图片，请直接复制这串链接去浏览器打开获取最新认证二维码：<br>{qr_url}</p>
                 </div>
@@ -830,16 +1106,16 @@ class Streamer:
                 }
                 
                 is_verified = False
-                max_attempts = 120 # 允许最多等待 120 秒，给你留出看邮件的时间
-                attempts = 0
+                deadline = time.monotonic() + 120  # 允许最多等待 120 秒，给你留出看邮件的时间
+                delay = 0.5  # 轮询间隔从 0.5 秒逐步放宽到 5 秒，扫码通常需要十几秒
                 
                 log.info("⏳ 开始轮询人脸认证结果 (超时时间 120 秒)...")
-                while not is_verified and attempts < max_attempts:
+                while not is_verified and time.monotonic() < deadline:
                     if not self._running:
                         return False # 如果用户手动点击了关闭就提前终止
                         
                     try:
-                        auth_resp = requests.post(face_auth_url, headers=headers, data=face_auth_data, timeout=5)
+                        auth_resp = self._http.post(face_auth_url, headers=headers, data=face_auth_data, timeout=5)
                         auth_json = auth_resp.json()
                         if auth_json.get("code") == 0 and auth_json.get("data", {}).get("is_identified"):
                             log.info("✅ 检测到扫码人脸验证成功！继续开播流程")
@@ -848,13 +1124,13 @@ class Streamer:
                     except Exception as e:
                         pass
                     
-                    time.sleep(1)
-                    attempts += 1
+                    time.sleep(delay)
+                    delay = min(delay * 1.3, 5.0)
                     
                 if is_verified:
                     # 重新调用 startLive
                     log.info("🔄 再次请求 B 站开启直播...")
-                    resp2 = requests.post(url, headers=headers, data=data, timeout=10)
+                    resp2 = self._http.post(url, headers=headers, data=data, timeout=10)
                     resp_json2 = resp2.json()
                     
                     if resp_json2.get("code") == 0:
@@ -890,15 +1166,7 @@ class Streamer:
             
         # 并将其写入 config.yaml 文件持久化
         try:
-            with open("config.yaml", "r", encoding="utf-8") as f:
-                full_config = yaml.safe_load(f)
-                
-            full_config["stream"]["rtmp_url"] = rtmp_url
-            full_config["stream"]["stream_key"] = rtmp_code
-            
-            with open("config.yaml", "w", encoding="utf-8") as f:
-                yaml.dump(full_config, f, allow_unicode=True, sort_keys=False)
-                
+            self._persist_stream_config(rtmp_url, rtmp_code)
             log.info(f"✅ 新的推流地址已更新并保存在 config.yaml。")
             # 重启推流器以使用新的 RTMP 地址
             self._restart_pusher()
@@ -908,16 +1176,36 @@ class Streamer:
             self._restart_pusher()
             return True
 
+    @staticmethod
+    def _persist_stream_config(rtmp_url: str, stream_key: str):
+        """把新的推流地址写回 config.yaml
+
+        先序列化完整内容再一次性写入，序列化出错时不会留下被截断的配置文件；
+        不用临时文件 + os.replace，因为 Docker 部署中 config.yaml 是单文件挂载，无法被替换。
+        """
+        with open("config.yaml", "r", encoding="utf-8") as f:
+            full_config = yaml.safe_load(f)
+        full_config["stream"]["rtmp_url"] = rtmp_url
+        full_config["stream"]["stream_key"] = stream_key
+        data = yaml.dump(full_config, allow_unicode=True, sort_keys=False)
+        with open("config.yaml", "w", encoding="utf-8") as f:
+            f.write(data)
+
     def _run_diagnosis(self) -> dict:
-        """执行全部自检项目"""
-        checks = []
-        checks.append(self._check_network())
-        checks.append(self._check_dns())
-        checks.append(self._check_rtmp())
-        checks.append(self._check_stream_key())
-        checks.append(self._check_live_status())
-        checks.append(self._check_webdav())
-        checks.append(self._check_system())
+        """并发执行全部自检项目，总耗时取决于最慢的一项（推流码验证）"""
+        check_fns = (
+            self._check_network,
+            self._check_dns,
+            self._check_rtmp,
+            self._check_stream_key,
+            self._check_live_status,
+            self._check_webdav,
+            self._check_system,
+        )
+        with ThreadPoolExecutor(max_workers=len(check_fns)) as ex:
+            # 系统资源检查要阻塞采样 1 秒，最先提交；报告仍按原顺序排列
+            futures = {fn: ex.submit(fn) for fn in reversed(check_fns)}
+            checks = [futures[fn].result() for fn in check_fns]
         return {"checks": checks}
 
     def _check_network(self) -> dict:
@@ -933,9 +1221,9 @@ class Streamer:
     def _check_dns(self) -> dict:
         """检查 RTMP 域名 DNS 解析"""
         name = "DNS 解析"
-        rtmp_url = self.stream_cfg.get("rtmp_url", "")
-        host = urlparse(rtmp_url).hostname or "live-push.bilivideo.com"
+        host, _ = _rtmp_endpoint(self.stream_cfg.get("rtmp_url", ""))
         try:
+            # 每次自检都重新解析：自检本身已有冷却时间，缓存只会在故障期间报告过时的"解析正常"
             ip = socket.gethostbyname(host)
             return {"id": "dns", "name": name, "ok": True, "detail": f"{host} → {ip}"}
         except Exception as e:
@@ -944,9 +1232,7 @@ class Streamer:
     def _check_rtmp(self) -> dict:
         """检查 RTMP 服务器端口可达性"""
         name = "RTMP 连接"
-        rtmp_url = self.stream_cfg.get("rtmp_url", "")
-        host = urlparse(rtmp_url).hostname or "live-push.bilivideo.com"
-        port = urlparse(rtmp_url).port or 1935
+        host, port = _rtmp_endpoint(self.stream_cfg.get("rtmp_url", ""))
         try:
             sock = socket.create_connection((host, port), timeout=10)
             sock.close()
@@ -959,7 +1245,7 @@ class Streamer:
         name = "推流码验证"
         rtmp_url = self.stream_cfg["rtmp_url"] + self.stream_cfg["stream_key"]
         cmd = [
-            "ffmpeg", "-y",
+            _ffmpeg_bin(), "-y",
             "-f", "lavfi", "-i", "color=c=black:s=320x240:d=3",
             "-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo",
             "-t", "3",
@@ -968,16 +1254,58 @@ class Streamer:
             "-f", "flv", rtmp_url,
         ]
         try:
-            result = subprocess.run(cmd, capture_output=True, timeout=15)
-            if result.returncode == 0:
+            proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            returncode, stderr = self._wait_push_probe(proc, 15)
+            if returncode is None:
+                return {"id": "stream_key", "name": name, "ok": False, "detail": "推送超时（15 秒）"}
+            if returncode == 0:
                 return {"id": "stream_key", "name": name, "ok": True, "detail": "推流码有效，空流推送成功"}
-            stderr = result.stderr.decode("utf-8", errors="replace")[-200:]
+            stderr = stderr.decode("utf-8", errors="replace")[-200:]
             return {"id": "stream_key", "name": name, "ok": False, "detail": f"推流失败: {stderr.strip()}"}
-        except subprocess.TimeoutExpired:
-            return {"id": "stream_key", "name": name, "ok": False, "detail": "推送超时（15 秒）"}
         except Exception as e:
             return {"id": "stream_key", "name": name, "ok": False, "detail": f"异常: {e}"}
 
+    @staticmethod
+    def _wait_push_probe(proc: subprocess.Popen, timeout: float) -> tuple[int | None, bytes]:
+        """等待推流探测进程结束，返回 (退出码, stderr)，超时时退出码为 None
+
+        stderr 一出现失败特征就结束进程，RTMP 拒绝连接时约 1 秒即可得出结果。
+        Windows 管道不支持 select，退回等待进程自然结束。
+        """
+        if os.name == "nt":
+            try:
+                _, err = proc.communicate(timeout=timeout)
+                return proc.returncode, err
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                return None, proc.communicate()[1]
+
+        deadline = time.monotonic() + timeout
+        fd = proc.stderr.fileno()
+        err = bytearray()
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    proc.kill()
+                    proc.wait()
+                    return None, bytes(err)
+                ready, _, _ = select.select([fd], [], [], remaining)
+                if not ready:
+                    continue
+                chunk = os.read(fd, 65536)
+                if not chunk:  # EOF：进程已退出
+                    break
+                # 从上一块末尾附近开始匹配，兼顾跨块的特征且不重复扫描整个缓冲区
+                start = max(0, len(err) - 32)
+                err += chunk
+                if _RE_PUSH_FAILED.search(err, start):
+                    proc.kill()
+                    break
+            return proc.wait(), bytes(err)
+        finally:
+            proc.stderr.close()
+
     def _check_live_status(self) -> dict:
         """通过 B 站 API 检查直播间是否正在直播"""
         name = "直播间状态"
@@ -986,8 +1314,8 @@ class Streamer:
             return {"id": "live_status", "name": name, "ok": True, "detail": "未配置 room_id，跳过"}
         try:
             url = f"https://api.live.bilibili.com/room/v1/Room/get_info?room_id={room_id}"
-            resp = requests.get(url, timeout=10)
-            data = resp.json()
+            resp = self._http.get(url, timeout=10)
+            data = orjson.loads(resp.content) if orjson else resp.json()
             if data.get("code") != 0:
                 return {"id": "live_status", "name": name, "ok": False, "detail": f"API 返回错误: {data.get('message', '未知')}"}
             live_status = data.get("data", {}).get("live_status", 0)
@@ -999,17 +1327,31 @@ class Streamer:
             return {"id": "live_status", "name": name, "ok": False, "detail": f"查询失败: {e}"}
 
     def _check_webdav(self) -> dict:
-        """检查 WebDAV 视频源可用性"""
+        """检查 WebDAV 视频源可用性（带认证发送 HEAD，只有 2xx 视为正常；多个源全部正常才算通过）"""
         name = "WebDAV 连接"
+        import httpx
         from sources.webdav import WebDAVSource
-        for source in self.playlist.sources:
-            if isinstance(source, WebDAVSource):
-                try:
-                    resp = requests.head(source.url, timeout=10, verify=False)
-                    return {"id": "webdav", "name": name, "ok": True, "detail": f"{source.url} 可达 ({resp.status_code})"}
-                except Exception as e:
-                    return {"id": "webdav", "name": name, "ok": False, "detail": f"{source.url} 不可达: {e}"}
-        return {"id": "webdav", "name": name, "ok": True, "detail": "未配置 WebDAV 源"}
+        sources = [src for src in self.playlist.sources if isinstance(src, WebDAVSource)]
+        if not sources:
+            return {"id": "webdav", "name": name, "ok": True, "detail": "未配置 WebDAV 源"}
+        ok = True
+        details = []
+        for source in sources:
+            try:
+                # 复用视频源自己的 httpx 客户端：已带认证，连接池跨自检与扫描共享
+                resp = source.client.http.head(
+                    source.url, timeout=httpx.Timeout(5, connect=3), follow_redirects=True,
+                )
+            except Exception as e:
+                ok = False
+                details.append(f"{source.url} 不可达: {e}")
+                continue
+            if resp.is_success:
+                details.append(f"{source.url} 可达 ({resp.status_code})")
+            else:
+                ok = False
+                details.append(f"{source.url} 返回异常状态 ({resp.status_code})")
+        return {"id": "webdav", "name": name, "ok": ok, "detail": "；".join(details)}
 
     def _check_system(self) -> dict:
         """检查系统资源"""
@@ -1032,17 +1374,16 @@ class Streamer:
     @staticmethod
     def _format_report_html(report: dict) -> str:
         """生成 HTML 格式自检报告"""
-        rows = ""
+        rows = []
         for c in report["checks"]:
-            icon = "✅" if c["ok"] else "❌"
-            color = "#22c55e" if c["ok"] else "#ef4444"
-            status = "正常" if c["ok"] else "异常"
-            rows += f"""
+            icon, color, status = _CHECK_STYLE[bool(c["ok"])]
+            # 详情中可能包含 FFmpeg / API 返回的原始错误文本，插入 HTML 前先转义
+            rows.append(f"""
             <tr>
-                <td style="padding:10px 14px;border-bottom:1px solid #333">{icon} {c['name']}</td>
+                <td style="padding:10px 14px;border-bottom:1px solid #333">{icon} {html.escape(c['name'])}</td>
                 <td style="padding:10px 14px;border-bottom:1px solid #333;color:{color};font-weight:600">{status}</td>
-                <td style="padding:10px 14px;border-bottom:1px solid #333;color:#999;font-size:13px">{c['detail']}</td>
-            </tr>"""
+                <td style="padding:10px 14px;border-bottom:1px solid #333;color:#999;font-size:13px">{html.escape(str(c['detail']))}</td>
+            </tr>""")
 
         passed = sum(1 for c in report["checks"] if c["ok"])
         total = len(report["checks"])
@@ -1054,8 +1395,8 @@ class Streamer:
             <p style="color:#888;margin:0 0 20px;font-size:14px">{report['time']}</p>
 
             <div style="background:#111;border:1px solid #333;border-radius:8px;padding:16px;margin-bottom:20px">
-                <p style="margin:0 0 6px"><strong>触发原因:</strong> {report['reason']}</p>
-                <p style="margin:0 0 6px"><strong>当前视频:</strong> {report['video']}</p>
+                <p style="margin:0 0 6px"><strong>触发原因:</strong> {html.escape(report['reason'])}</p>
+                <p style="margin:0 0 6px"><strong>当前视频:</strong> {html.escape(report['video'])}</p>
                 <p style="margin:0"><strong>累计失败:</strong> {report['total_failures']} 次</p>
             </div>
 
@@ -1067,7 +1408,7 @@ class Streamer:
                         <th style="padding:10px 14px;text-align:left;color:#888;font-size:12px;text-transform:uppercase">详情</th>
                     </tr>
                 </thead>
-                <tbody>{rows}</tbody>
+                <tbody>{"".join(rows)}</tbody>
             </table>
 
             <div style="margin-top:20px;padding:14px;background:#111;border:1px solid #333;border-radius:8px;text-align:center">
@@ -1083,13 +1424,38 @@ class Streamer:
         """发送邮件通知（异步，不阻塞推流）"""
         if not self.email_cfg.get("enabled", False):
             return
-        threading.Thread(
-            target=self._do_email, args=(self.email_cfg, title, content, is_html), daemon=True
-        ).start()
-
-    @staticmethod
-    def _do_email(cfg: dict, title: str, content: str, is_html: bool = False):
-        """实际发送邮件"""
+        if not self._email_worker_started:
+            with self._email_worker_lock:
+                if not self._email_worker_started:
+                    threading.Thread(target=self._email_worker, daemon=True).start()
+                    self._email_worker_started = True
+        item = (title, content, is_html)
+        try:
+            self._email_queue.put_nowait(item)
+        except queue.Full:
+            # 丢弃最旧的一封，保留最新状态
+            try:
+                self._email_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._email_dropped += 1
+            try:
+                self._email_queue.put_nowait(item)
+            except queue.Full:
+                self._email_dropped += 1
+
+    def _email_worker(self):
+        """后台邮件发送线程"""
+        while True:
+            title, content, is_html = self._email_queue.get()
+            self._do_email(title, content, is_html)
+            if self._email_dropped and self._email_queue.empty():
+                log.info("邮件队列曾满，已丢弃 %d 封较早的通知", self._email_dropped)
+                self._email_dropped = 0
+
+    def _do_email(self, title: str, content: str, is_html: bool = False):
+        """实际发送邮件（复用已登录的 SMTP 连接）"""
+        cfg = self.email_cfg
         try:
             if is_html:
                 msg = MIMEText(content, "html", "utf-8")
@@ -1100,14 +1466,49 @@ class Streamer:
             msg["From"] = cfg["from_addr"]
             msg["To"] = cfg["to_addr"]
 
-            if cfg.get("ssl", True):
-                smtp = smtplib.SMTP_SSL(cfg["host"], cfg.get("port", 465), timeout=30)
-            else:
-                smtp = smtplib.SMTP(cfg["host"], cfg.get("port", 25), timeout=30)
-                smtp.starttls()
-            smtp.login(cfg["from_addr"], cfg["password"])
-            smtp.sendmail(cfg["from_addr"], cfg["to_addr"], msg.as_string())
-            smtp.quit()
+            with self._smtp_lock:
+                try:
+                    self._smtp_connection().sendmail(cfg["from_addr"], cfg["to_addr"], msg.as_string())
+                except smtplib.SMTPServerDisconnected:
+                    # 连接在健康检查后被服务器关闭，重连后再发一次
+                    self._close_smtp()
+                    self._smtp_connection().sendmail(cfg["from_addr"], cfg["to_addr"], msg.as_string())
+                self._smtp_last_use = time.monotonic()
             log.info("邮件通知已发送至 %s", cfg["to_addr"])
         except Exception as e:
             log.warning("邮件发送失败: %s", e)
+            with self._smtp_lock:
+                self._close_smtp()
+
+    def _smtp_connection(self) -> smtplib.SMTP:
+        """返回可用的 SMTP 连接，已有连接失效时重新连接并登录（在 _smtp_lock 内调用）"""
+        if self._smtp is not None:
+            # 刚用过的连接直接复用（失效时由调用方重连重发），空闲较久才探活
+            if time.monotonic() - self._smtp_last_use < SMTP_IDLE_CHECK:
+                return self._smtp
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp()
+
+        cfg = self.email_cfg
+        if cfg.get("ssl", True):
+            smtp = smtplib.SMTP_SSL(cfg["host"], cfg.get("port", 465), timeout=30)
+        else:
+            smtp = smtplib.SMTP(cfg["host"], cfg.get("port", 25), timeout=30)
+            smtp.starttls()
+        smtp.login(cfg["from_addr"], cfg["password"])
+        self._smtp = smtp
+        return smtp
+
+    def _close_smtp(self):
+        """关闭复用的 SMTP 连接"""
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
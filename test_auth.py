@@ -0,0 +1,110 @@
+"""离线测试：JWT 签发/验签、Token 缓存与密码哈希迁移（无需 config.yaml）"""
+import sys
+sys.path.insert(0, ".")
+
+import base64
+import hashlib
+import json
+import tempfile
+import time
+import types
+from pathlib import Path
+
+import auth
+
+CONFIG = {"auth": {"secret_key": "test-secret", "admin_username": "admin", "admin_password": "admin123"}}
+
+
+def _b64(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _forge(header: dict, payload: dict) -> str:
+    """用当前密钥签发任意头部/载荷的 Token"""
+    header_b64 = _b64(json.dumps(header, separators=(",", ":")).encode())
+    signing_input = header_b64 + b"." + _b64(json.dumps(payload).encode())
+    return (signing_input + b"." + auth._sign(signing_input)).decode()
+
+
+def _fresh():
+    auth.init_admin(CONFIG)  # 同时清空 Token 缓存
+
+
+def test_token_round_trip():
+    _fresh()
+    token = auth.create_token("alice", "mod")
+    assert auth.verify_token(token) == {"username": "alice", "role": "mod"}
+    # 第二次命中缓存，结果不变，且返回的是副本
+    user = auth.verify_token(token)
+    user["role"] = "admin"
+    assert auth.verify_token(token) == {"username": "alice", "role": "mod"}
+
+
+def test_tampered_token_rejected():
+    _fresh()
+    header, body, signature = auth.create_token("alice", "mod").split(".")
+    bad_sig = signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")
+    assert auth.verify_token(f"{header}.{body}.{bad_sig}") is None
+
+    payload = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+    payload["role"] = "admin"
+    forged_body = _b64(json.dumps(payload).encode()).decode()
+    assert auth.verify_token(f"{header}.{forged_body}.{signature}") is None
+
+    assert auth.verify_token("not-a-token") is None
+    assert auth.verify_token("") is None
+
+
+def test_other_alg_rejected():
+    _fresh()
+    payload = {"sub": "alice", "role": "admin", "exp": int(time.time()) + 3600}
+    assert auth.verify_token(_forge({"alg": "HS384", "typ": "JWT"}, payload)) is None
+    unsigned = _forge({"alg": "none", "typ": "JWT"}, payload).rpartition(".")[0] + "."
+    assert auth.verify_token(unsigned) is None
+
+
+def test_expired_token_rejected():
+    _fresh()
+    now = time.time()
+    expired = _forge({"alg": "HS256", "typ": "JWT"}, {"sub": "alice", "role": "mod", "exp": int(now) - 1})
+    assert auth.verify_token(expired) is None
+
+    # 验证通过并进入缓存后过期，也必须被拒绝
+    token = _forge({"alg": "HS256", "typ": "JWT"}, {"sub": "alice", "role": "mod", "exp": int(now) + 60})
+    assert auth.verify_token(token) == {"username": "alice", "role": "mod"}
+    assert token in auth._token_cache
+    real_time = auth.time
+    auth.time = types.SimpleNamespace(time=lambda: now + 120)
+    try:
+        assert auth.verify_token(token) is None
+    finally:
+        auth.time = real_time
+
+
+def test_legacy_sha256_hash_upgraded_to_scrypt():
+    _fresh()
+    real_users_file = auth.USERS_FILE
+    with tempfile.TemporaryDirectory() as tmp:
+        auth.USERS_FILE = Path(tmp) / "users.json"
+        try:
+            legacy = hashlib.sha256(b"old-pass").hexdigest()
+            auth.save_users([{"username": "bob", "password_hash": legacy, "role": "mod"}])
+
+            assert auth.authenticate("bob", "wrong") is None
+            assert auth.authenticate("bob", "old-pass") == {"username": "bob", "role": "mod"}
+            stored = auth.load_users()[0]["password_hash"]
+            assert stored.startswith("scrypt$"), stored
+            assert auth.authenticate("bob", "old-pass") == {"username": "bob", "role": "mod"}
+            assert auth.authenticate("bob", "wrong") is None
+            assert auth.authenticate("admin", "admin123") == {"username": "admin", "role": "admin"}
+        finally:
+            auth.USERS_FILE = real_users_file
+
+
+if __name__ == "__main__":
+    test_token_round_trip()
+    test_tampered_token_rejected()
+    test_other_alg_rejected()
+    test_expired_token_rejected()
+    test_legacy_sha256_hash_upgraded_to_scrypt()
+    print("✅ 认证模块测试通过")
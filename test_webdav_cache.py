@@ -0,0 +1,93 @@
+"""离线测试：WebDAV 整棵目录树的列举缓存（模拟 DAV 服务器，无需 config.yaml）"""
+import sys
+sys.path.insert(0, ".")
+
+from urllib.parse import quote
+
+import httpx
+from webdav4.client import Client
+
+from sources.webdav import WebDAVSource
+
+# /dav/v 下的目录树：含空目录、只有字幕的目录和排除目录
+TREE = {
+    "/dav/v": ["a/", "empty/", "subs/", ".Trash/", "x.mp4"],
+    "/dav/v/a": ["deep/", "y.mkv"],
+    "/dav/v/a/deep": ["z.mp4"],
+    "/dav/v/empty": [],
+    "/dav/v/subs": ["x.srt"],
+    "/dav/v/.Trash": ["old.mp4"],
+}
+
+
+def _response(path: str, is_dir: bool) -> str:
+    href = quote(path) + ("/" if is_dir else "")
+    rt = "<d:collection/>" if is_dir else ""
+    return (
+        f"<d:response><d:href>{href}</d:href><d:propstat><d:prop>"
+        f"<d:resourcetype>{rt}</d:resourcetype></d:prop>"
+        f"<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>"
+    )
+
+
+def _walk(path: str, deep: bool, out: list[str]):
+    for child in TREE[path]:
+        child_path = f"{path}/{child.rstrip('/')}"
+        out.append(_response(child_path, child.endswith("/")))
+        if deep and child.endswith("/"):
+            _walk(child_path, deep, out)
+
+
+def _make_source(calls: list, honour_infinity: bool = True) -> WebDAVSource:
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path.rstrip("/")
+        depth = request.headers.get("Depth")
+        calls.append((request.method, path, depth))
+        out = [_response(path, True)]
+        # honour_infinity=False 模拟 SabreDAV：把 Depth: infinity 悄悄当作 Depth: 1
+        _walk(path, depth == "infinity" and honour_infinity, out)
+        body = '<?xml version="1.0"?><d:multistatus xmlns:d="DAV:">' + "".join(out) + "</d:multistatus>"
+        return httpx.Response(207, text=body)
+
+    source = WebDAVSource("http://dav.test/dav", "u", "p", "/v", [".mp4", ".mkv"])
+    source.client = Client(
+        base_url="http://dav.test/dav",
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+    return source
+
+
+def test_second_scan_within_ttl_is_served_from_cache():
+    calls: list = []
+    source = _make_source(calls)
+
+    first = [v.name for v in source.list_videos()]
+    assert first == ["z.mp4", "y.mkv", "x.mp4"], first
+    # 空目录在响应里没有子项，无法证明已列举，单独补一次 Depth: 1
+    assert calls == [("PROPFIND", "/dav/v", "infinity"), ("PROPFIND", "/dav/v/empty", "1")], calls
+
+    calls.clear()
+    second = [v.name for v in source.list_videos()]
+    assert second == first, second
+    assert calls == [], f"TTL 内重复扫描不应发出请求: {calls}"
+
+
+def test_depth_infinity_downgraded_to_depth_1_falls_back_to_levels():
+    calls: list = []
+    source = _make_source(calls, honour_infinity=False)
+
+    found = sorted(v.name for v in source.list_videos())
+    assert found == ["x.mp4", "y.mkv", "z.mp4"], found
+    assert source._depth_infinity is False
+
+    # 之后不再尝试 Depth: infinity
+    calls.clear()
+    source._listing_cache.clear()
+    assert sorted(v.name for v in source.list_videos()) == found
+    assert all(depth == "1" for _, _, depth in calls), calls
+
+
+if __name__ == "__main__":
+    test_second_scan_within_ttl_is_served_from_cache()
+    test_depth_infinity_downgraded_to_depth_1_falls_back_to_levels()
+    print("✅ 目录树缓存测试通过")
@@ -9,8 +9,8 @@ import yaml
 from fastapi import FastAPI, Request, UploadFile, File, Depends, HTTPException, status
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, FileResponse
 from fastapi.security import APIKeyCookie
+from starlette.concurrency import run_in_threadpool
 
-from sources.webdav import WebDAVSource
 import auth
 
 log = logging.getLogger(__name__)
@@ -71,7 +71,8 @@ async def api_login(request: Request):
     body = await request.json()
     username = body.get("username", "")
     password = body.get("password", "")
-    user = auth.authenticate(username, password)
+    # scrypt 校验约耗时 50ms CPU，放到线程池执行，避免阻塞事件循环（状态轮询等请求）
+    user = await run_in_threadpool(auth.authenticate, username, password)
     if not user:
         return JSONResponse({"ok": False, "msg": "用户名或密码错误"}, status_code=401)
     token = auth.create_token(user["username"], user["role"])
@@ -107,7 +108,7 @@ async def api_add_user(request: Request, admin: dict = Depends(require_admin)):
     password = body.get("password", "").strip()
     if not username or not password:
         return JSONResponse({"ok": False, "msg": "用户名和密码不能为空"}, status_code=400)
-    ok, msg = auth.add_user(username, password)
+    ok, msg = await run_in_threadpool(auth.add_user, username, password)  # 同样要做 scrypt 哈希
     return {"ok": ok, "msg": msg}
 
 
@@ -188,6 +189,7 @@ async def start_stream(admin: dict = Depends(require_admin)):
 async def browse_dir(path: str = "/", user: dict = Depends(get_current_user)):
     if not _streamer:
         raise HTTPException(status_code=503, detail="推流服务未初始化")
+    from sources.webdav import WebDAVSource
     for source in _streamer.playlist.sources:
         if isinstance(source, WebDAVSource):
             items = source.list_dirs(path)
@@ -249,6 +251,8 @@ async def save_overlay(request: Request, admin: dict = Depends(require_admin)):
         if _streamer:
             _streamer.webcam_cfg = body["webcam"]
 
+    if _streamer:
+        _streamer.reload_layout()
     _save_config()
     log.info("Web 操作: 更新画面设置")
     
@@ -276,6 +280,7 @@ async def upload_logo(admin: dict = Depends(require_admin), file: UploadFile = F
     _config["logo"]["path"] = save_name
     if _streamer:
         _streamer.logo_cfg = _config["logo"]
+        _streamer.reload_layout()
     _save_config()
     log.info("Web 操作: 上传台标 %s", save_name)
     return {"ok": True, "msg": f"台标已上传: {save_name}", "path": save_name}